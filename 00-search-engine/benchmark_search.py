@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding: utf-8
+import argparse
+import json
+import random
+import time
+
+import minsearch
+
+from bm25_index import BM25Index
+
+
+TEXT_FIELDS = ["question", "text", "section"]
+KEYWORD_FIELDS = ["course"]
+BOOST_DICT = {"question": 3.0, "section": 0.3}
+
+
+def load_documents(path: str) -> list:
+    """
+    Loads the FAQ documents from a documents.json file.
+
+    Args:
+        path (str): Path to a JSON file with a list of courses and their documents.
+
+    Returns:
+        list: A flat list of documents with the course attached.
+    """
+    with open(path, "rt") as f_in:
+        docs_raw = json.load(f_in)
+
+    documents = []
+    for course_dict in docs_raw:
+        for doc in course_dict["documents"]:
+            documents.append({**doc, "course": course_dict["course"]})
+    return documents
+
+
+def benchmark(name: str, index_factory, documents: list, queries: list, num_results: int) -> dict:
+    """
+    Measures build time and query throughput for one index implementation.
+
+    Args:
+        name (str): Name shown in the report.
+        index_factory (callable): Creates an unfitted index.
+        documents (list): Documents to index.
+        queries (list): List of (query, course) pairs.
+        num_results (int): Number of results per query.
+
+    Returns:
+        dict: Build seconds and queries/sec.
+    """
+    start = time.perf_counter()
+    index = index_factory()
+    index.fit(documents)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query, course in queries:
+        index.search(query, boost_dict=BOOST_DICT, filter_dict={"course": course}, num_results=num_results)
+    query_time = time.perf_counter() - start
+
+    result = {"name": name, "build_s": build_time, "qps": len(queries) / query_time}
+    print(f"{name:>10}: build {build_time:.3f}s, {result['qps']:.0f} queries/sec")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare BM25Index against minsearch on the FAQ corpus")
+    parser.add_argument("--documents", default="../cohorts/2025/01-intro/documents.json")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--num-results", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = load_documents(args.documents)
+    random.seed(1)
+    sample = random.choices(documents, k=args.queries)
+    queries = [(doc["question"], doc["course"]) for doc in sample]
+    print(f"{len(documents)} documents, {len(queries)} queries")
+
+    benchmark("minsearch",
+              lambda: minsearch.Index(text_fields=TEXT_FIELDS, keyword_fields=KEYWORD_FIELDS),
+              documents, queries, args.num_results)
+    benchmark("bm25",
+              lambda: BM25Index(text_fields=TEXT_FIELDS, keyword_fields=KEYWORD_FIELDS),
+              documents, queries, args.num_results)
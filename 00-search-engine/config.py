@@ -20,6 +20,12 @@ index_settings = {
 
 index_name = "course-questions"
 
+bulk_settings = {
+    "chunk_size": int(os.getenv("ES_BULK_CHUNK_SIZE", 500)),
+    "max_chunk_bytes": int(os.getenv("ES_BULK_MAX_CHUNK_BYTES", 10 * 1024 * 1024)),
+    "thread_count": int(os.getenv("ES_BULK_THREADS", 4)),
+}
+
 search_query = {
     "size": 5,
     "query": {
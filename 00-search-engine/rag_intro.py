@@ -2,14 +2,16 @@
 # coding: utf-8
 import json
 import os
+import time
 
-import minsearch
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import BadRequestError
+from elasticsearch.helpers import parallel_bulk
 from openai import OpenAI
 from tqdm.auto import tqdm
 
-from config import host, index_name, index_settings, search_query
+from bm25_index import BM25Index
+from config import bulk_settings, host, index_name, index_settings, search_query
 
 
 def extract_documents(files: list[str]) -> list:
@@ -36,13 +38,13 @@ def extract_documents(files: list[str]) -> list:
 class Minsearch:
     def __init__(self, text_fields, keyword_fields):
         """
-        Initializes the Minsearch index with specified text and keyword fields.
+        Initializes the in-process BM25 index with specified text and keyword fields.
         
         Args:
             text_fields (list): List of text fields to be indexed.
             keyword_fields (list): List of keyword fields to be indexed.
         """
-        self.index = minsearch.Index(text_fields=text_fields, keyword_fields=keyword_fields)
+        self.index = BM25Index(text_fields=text_fields, keyword_fields=keyword_fields)
 
     def fit(self, documents):
         """
@@ -82,9 +84,92 @@ class ElasticSearch:
         except Exception as e:
             print(f"An error occurred while creating the index: {e}")
     
+    def delete_index(self):
+        self.client.indices.delete(index=self.index_name, ignore_unavailable=True)
+
     def fit(self, documents: list):
         for doc in tqdm(documents):
             self.client.index(document=doc, index=self.index_name)
+
+    def fit_bulk(self, documents: list, chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024,
+                 thread_count: int = 4, max_retries: int = 3) -> dict:
+        """
+        Indexes documents through the _bulk API with several requests in flight.
+
+        Refresh is disabled while loading and restored afterwards. Items rejected by
+        a bulk request are retried one by one with a short backoff.
+
+        Args:
+            documents (list): List of documents to be indexed.
+            chunk_size (int, optional): Maximum number of documents per bulk request. Defaults to 500.
+            max_chunk_bytes (int, optional): Maximum size of a bulk request in bytes. Defaults to 10MB.
+            thread_count (int, optional): Number of bulk requests sent in parallel. Defaults to 4.
+            max_retries (int, optional): Attempts per failed document when retrying individually. Defaults to 3.
+
+        Returns:
+            dict: Number of indexed and failed documents, elapsed seconds and docs/sec.
+        """
+        settings = self.client.indices.get_settings(index=self.index_name)
+        refresh_interval = settings[self.index_name]["settings"]["index"].get("refresh_interval")
+        self.client.indices.put_settings(index=self.index_name, settings={"index": {"refresh_interval": "-1"}})
+
+        start = time.time()
+        failed = []
+        try:
+            actions = ({"_index": self.index_name, "_source": doc} for doc in documents)
+            # parallel_bulk yields one result per action, in the order the actions were given
+            results = parallel_bulk(self.client, actions,
+                                    thread_count=thread_count,
+                                    chunk_size=chunk_size,
+                                    max_chunk_bytes=max_chunk_bytes,
+                                    raise_on_error=False,
+                                    raise_on_exception=False)
+            for doc, (ok, _) in tqdm(zip(documents, results), total=len(documents)):
+                if not ok:
+                    failed.append(doc)
+
+            failed = self._retry_individually(failed, max_retries=max_retries)
+        finally:
+            self.client.indices.put_settings(index=self.index_name,
+                                             settings={"index": {"refresh_interval": refresh_interval}})
+            self.client.indices.refresh(index=self.index_name)
+
+        elapsed = time.time() - start
+        indexed = len(documents) - len(failed)
+        stats = {
+            "indexed": indexed,
+            "failed": len(failed),
+            "seconds": elapsed,
+            "docs_per_sec": indexed / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"Indexed {indexed} documents in {elapsed:.2f}s ({stats['docs_per_sec']:.0f} docs/sec), "
+              f"{len(failed)} failed")
+        return stats
+
+    def _retry_individually(self, documents: list, max_retries: int = 3) -> list:
+        """
+        Retries documents one request at a time.
+
+        Args:
+            documents (list): Documents that failed during the bulk load.
+            max_retries (int, optional): Attempts per document. Defaults to 3.
+
+        Returns:
+            list: Documents that still could not be indexed.
+        """
+        still_failed = []
+        for doc in documents:
+            for attempt in range(max_retries):
+                try:
+                    self.client.index(document=doc, index=self.index_name)
+                    break
+                except Exception as e:
+                    if attempt == max_retries - 1:
+                        print(f"Failed to index document after {max_retries} attempts: {e}")
+                        still_failed.append(doc)
+                    else:
+                        time.sleep(2 ** attempt)
+        return still_failed
     
     def search(self, search_query: dict):
         results = self.client.search(index=self.index_name, body=search_query)
@@ -195,13 +280,13 @@ if __name__ == "__main__":
     print(client_response)
 
     es = ElasticSearch(host=host, index_name=index_name)
+
+    # Recreate the index so a reload does not duplicate documents
+    es.delete_index()
     es.create_index(index_settings=index_settings)
 
     # Fit the Elasticsearch index with the documents
-    if len(documents) > 1034:
-        es.fit(documents)
-    else:
-        print("Skipping indexing as the number of documents is less than 1034.")
+    es.fit_bulk(documents, **bulk_settings)
     search_query["query"]["bool"]["must"]["multi_match"]["query"] = query
 
     # Search the Elasticsearch index
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+COURSES_URL = 'https://datatalks.club/faq/json/courses.json'
+FAQ_URL_PREFIX = 'https://datatalks.club/faq'
+
+
+class FAQFetcher:
+    """Downloads FAQ JSON files concurrently through a pooled session.
+
+    Responses are cached on disk together with their ETag and Last-Modified
+    headers. Later runs send conditional requests and reuse the cached body
+    on 304 Not Modified. In offline mode (offline=True or FAQ_OFFLINE=1)
+    everything is served from the cache without touching the network.
+    Connection errors, timeouts and HTTP errors fall back to the cached
+    copy when there is one.
+    """
+
+    def __init__(self, cache_dir=None, max_workers=8, offline=None, timeout=30):
+        if cache_dir is None:
+            cache_dir = os.getenv('FAQ_CACHE_DIR', '.faq_cache')
+        if offline is None:
+            offline = os.getenv('FAQ_OFFLINE', '0') == '1'
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.offline = offline
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{key}.json', self.cache_dir / f'{key}.meta.json'
+
+    def _read_cache(self, url):
+        body_path, meta_path = self._cache_paths(url)
+        if not body_path.exists() or not meta_path.exists():
+            return None, None
+        return body_path.read_bytes(), json.loads(meta_path.read_text())
+
+    def _write_cache(self, url, body, headers):
+        body_path, meta_path = self._cache_paths(url)
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        # write to a temporary file first so concurrent readers never see a partial file
+        for path, content in [(body_path, body), (meta_path, json.dumps(meta).encode('utf-8'))]:
+            tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+
+    def get_json(self, url):
+        cached_body, meta = self._read_cache(url)
+
+        if self.offline:
+            if cached_body is None:
+                raise FileNotFoundError(f'{url} is not in the FAQ cache ({self.cache_dir})')
+            return json.loads(cached_body)
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached_body is not None:
+                return json.loads(cached_body)
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            if cached_body is None:
+                raise
+            print(f'Could not fetch {url} ({e}), using the cached copy')
+            return json.loads(cached_body)
+
+        self._write_cache(url, response.content, response.headers)
+        return response.json()
+
+    def get_many(self, urls):
+        """Fetches all urls concurrently and returns the results in the same order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(self.get_json, urls))
+
+    def fetch_course_faqs(self, courses, url_prefix=FAQ_URL_PREFIX):
+        course_urls = [f'{url_prefix}{course["path"]}' for course in courses]
+
+        documents = []
+        for course_data in self.get_many(course_urls):
+            documents.extend(course_data)
+        return documents
+
+    def load_faq_data(self, courses_url=COURSES_URL, url_prefix=FAQ_URL_PREFIX):
+        courses = self.get_json(courses_url)
+        return self.fetch_course_faqs(courses, url_prefix=url_prefix)
@@ -1,8 +1,21 @@
 import requests
 from minsearch import Index
 
+try:
+    from faq_fetcher import FAQFetcher
+except ImportError:
+    # ingest.py was downloaded on its own, as in the lessons
+    FAQFetcher = None
 
-def load_faq_data():
+
+def load_faq_data(offline=None):
+    if FAQFetcher is None:
+        return load_faq_data_uncached()
+    fetcher = FAQFetcher(offline=offline)
+    return fetcher.load_faq_data()
+
+
+def load_faq_data_uncached():
     docs_url = 'https://datatalks.club/faq/json/courses.json'
     response = requests.get(docs_url)
     courses_raw = response.json()
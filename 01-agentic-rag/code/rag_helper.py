@@ -1,3 +1,26 @@
+import asyncio
+from functools import partial
+
+try:
+    from retry_policy import DEFAULT_POLICY, without_client_retries
+except ImportError:
+    # rag_helper.py was downloaded on its own, as in the lessons
+    class PlainCalls:
+        """Stand-in for RetryPolicy: calls once and leaves retrying to the OpenAI client."""
+        last_retries = 0
+
+        def call(self, f, *args, **kwargs):
+            return f(*args, **kwargs)
+
+        async def acall(self, f, *args, **kwargs):
+            return await f(*args, **kwargs)
+
+    DEFAULT_POLICY = PlainCalls()
+
+    def without_client_retries(client):
+        return client
+
+
 INSTRUCTIONS = '''
 Your task is to answer questions from the course participants
 based on the provided context.
@@ -24,10 +47,12 @@ class RAGBase:
         instructions=INSTRUCTIONS,
         prompt_template=PROMPT_TEMPLATE,
         course='llm-zoomcamp',
-        model='gpt-5.4-mini'
+        model='gpt-5.4-mini',
+        retry_policy=None
     ):
         self.index = index
-        self.llm_client = llm_client
+        self.llm_client = without_client_retries(llm_client)
+        self.retry_policy = retry_policy or DEFAULT_POLICY
         self.instructions = instructions
         self.course = course
         self.prompt_template = prompt_template
@@ -61,21 +86,99 @@ class RAGBase:
             question=query, context=context
         )
 
-    def llm(self, prompt):
-        input_messages = [
+    def build_messages(self, prompt):
+        return [
             {'role': 'developer', 'content': self.instructions},
             {'role': 'user', 'content': prompt}
         ]
 
-        response = self.llm_client.responses.create(
+    def llm(self, prompt):
+        response = self.retry_policy.call(
+            self.llm_client.responses.create,
             model=self.model,
-            input=input_messages
+            input=self.build_messages(prompt)
         )
 
         return response.output_text
 
+    def llm_stream(self, prompt):
+        stream = self.retry_policy.call(
+            self.llm_client.responses.create,
+            model=self.model,
+            input=self.build_messages(prompt),
+            stream=True
+        )
+
+        for event in stream:
+            if event.type == 'response.output_text.delta':
+                yield event.delta
+
     def rag(self, query):
         search_results = self.search(query)
         prompt = self.build_prompt(query, search_results)
         answer = self.llm(prompt)
         return answer
+
+    def rag_stream(self, query):
+        """Like rag, but yields the answer text as it is generated."""
+        search_results = self.search(query)
+        prompt = self.build_prompt(query, search_results)
+        yield from self.llm_stream(prompt)
+
+
+class AsyncRAGBase(RAGBase):
+    """RAGBase for asyncio, llm_client must be an openai.AsyncOpenAI client.
+
+    The index search is CPU-bound and synchronous, so it runs in an
+    executor (the loop's default thread pool unless one is given) while
+    the LLM calls are awaited on the event loop.
+    """
+
+    def __init__(self, *args, executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+
+    async def asearch(self, query, num_results=5):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self.search, query, num_results=num_results)
+        )
+
+    async def allm(self, prompt):
+        response = await self.retry_policy.acall(
+            self.llm_client.responses.create,
+            model=self.model,
+            input=self.build_messages(prompt)
+        )
+
+        return response.output_text
+
+    async def arag(self, query):
+        search_results = await self.asearch(query)
+        prompt = self.build_prompt(query, search_results)
+        answer = await self.allm(prompt)
+        return answer
+
+    async def arag_many(self, queries, concurrency=50, return_exceptions=False):
+        """Answers all queries with at most `concurrency` in flight, in input order.
+
+        By default the first failure cancels the queries that are still
+        running or waiting, and its exception is raised. With
+        return_exceptions=True every query runs to the end and a failed
+        query returns its exception in place of the answer.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(query):
+            async with semaphore:
+                return await self.arag(query)
+
+        if return_exceptions:
+            return await asyncio.gather(*(run(query) for query in queries), return_exceptions=True)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(run(query)) for query in queries]
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        return [task.result() for task in tasks]
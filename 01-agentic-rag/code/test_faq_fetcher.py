@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from faq_fetcher import FAQFetcher
+
+
+class FAQServer:
+    """Local stand-in for datatalks.club/faq that answers conditional GETs."""
+
+    def __init__(self):
+        self.files = {
+            '/json/courses.json': [{'path': '/json/course-a.json'}, {'path': '/json/course-b.json'}],
+            '/json/course-a.json': [{'id': 'a1', 'question': 'How to join?'}],
+            '/json/course-b.json': [{'id': 'b1', 'question': 'Where is the homework?'}],
+        }
+        self.requests = []
+        self.error_status = None
+        self.delay = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.delay)
+                if server.error_status is not None:
+                    self.send_response(server.error_status)
+                    self.end_headers()
+                    return
+                if self.path not in server.files:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                body = json.dumps(server.files[self.path]).encode('utf-8')
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                not_modified = self.headers.get('If-None-Match') == etag
+                server.requests.append((self.path, self.headers.get('If-None-Match'), not_modified))
+
+                if not_modified:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def load(self, fetcher):
+        return fetcher.load_faq_data(courses_url=f'{self.url}/json/courses.json', url_prefix=self.url)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = FAQServer()
+    yield server
+    server.stop()
+
+
+def test_first_fetch_downloads_and_caches(server, tmp_path):
+    documents = server.load(FAQFetcher(cache_dir=tmp_path))
+
+    assert [doc['id'] for doc in documents] == ['a1', 'b1']
+    assert all(etag is None for _, etag, _ in server.requests)
+    assert len(list(tmp_path.glob('*.meta.json'))) == 3
+
+
+def test_repeat_fetch_sends_conditional_get_and_reuses_body_on_304(server, tmp_path):
+    first = server.load(FAQFetcher(cache_dir=tmp_path))
+    server.requests.clear()
+
+    second = server.load(FAQFetcher(cache_dir=tmp_path))
+
+    assert second == first
+    assert len(server.requests) == 3
+    assert all(etag is not None and not_modified for _, etag, not_modified in server.requests)
+
+
+def test_changed_file_is_downloaded_again(server, tmp_path):
+    server.load(FAQFetcher(cache_dir=tmp_path))
+    server.files['/json/course-b.json'] = [{'id': 'b2', 'question': 'Is there a certificate?'}]
+
+    documents = server.load(FAQFetcher(cache_dir=tmp_path))
+
+    assert [doc['id'] for doc in documents] == ['a1', 'b2']
+
+
+def test_offline_mode_serves_the_cache_without_requests(server, tmp_path):
+    first = server.load(FAQFetcher(cache_dir=tmp_path))
+    server.requests.clear()
+
+    assert server.load(FAQFetcher(cache_dir=tmp_path, offline=True)) == first
+    assert server.requests == []
+
+
+def test_offline_mode_without_cache_raises(server, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        server.load(FAQFetcher(cache_dir=tmp_path, offline=True))
+
+
+def test_unreachable_server_falls_back_to_the_cache(server, tmp_path):
+    first = server.load(FAQFetcher(cache_dir=tmp_path))
+    server.stop()
+
+    assert server.load(FAQFetcher(cache_dir=tmp_path, timeout=2)) == first
+
+    with pytest.raises(requests.ConnectionError):
+        server.load(FAQFetcher(cache_dir=tmp_path / 'empty', timeout=2))
+
+
+def test_server_error_falls_back_to_the_cache(server, tmp_path):
+    first = server.load(FAQFetcher(cache_dir=tmp_path))
+    server.error_status = 503
+
+    assert server.load(FAQFetcher(cache_dir=tmp_path)) == first
+
+    with pytest.raises(requests.HTTPError):
+        server.load(FAQFetcher(cache_dir=tmp_path / 'empty'))
+
+
+def test_timeout_falls_back_to_the_cache(server, tmp_path):
+    first = server.load(FAQFetcher(cache_dir=tmp_path))
+    server.delay = 0.5
+
+    assert server.load(FAQFetcher(cache_dir=tmp_path, timeout=0.1)) == first
+
+    with pytest.raises(requests.Timeout):
+        server.load(FAQFetcher(cache_dir=tmp_path / 'empty', timeout=0.1))
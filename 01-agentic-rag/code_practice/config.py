@@ -2,6 +2,8 @@ import os
 
 COURSES_URL = "https://datatalks.club/faq/json/courses.json"
 COURSES_FAQ_BASE_URL = "https://datatalks.club/faq"
+FAQ_CACHE_DIR = os.getenv("FAQ_CACHE_DIR", ".faq_cache")
+FAQ_OFFLINE = os.getenv("FAQ_OFFLINE", "0") == "1"
 INSTRUCTIONS = '''
 Your task is to answer questions from the course participants
 based on the provided context.
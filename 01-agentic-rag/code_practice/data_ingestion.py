@@ -1,19 +1,21 @@
-import requests
-from tqdm.auto import tqdm
-from config import COURSES_URL, COURSES_FAQ_BASE_URL
+from faq_fetcher import FAQFetcher
+from config import COURSES_URL, COURSES_FAQ_BASE_URL, FAQ_CACHE_DIR, FAQ_OFFLINE
 
 
+_fetcher = None
+
+
+def get_fetcher() -> FAQFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = FAQFetcher(cache_dir=FAQ_CACHE_DIR, offline=FAQ_OFFLINE)
+    return _fetcher
+
 def fetch_data(url: str) -> list[dict]:
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    return get_fetcher().get_json(url)
 
 def fetch_course_faqs(courses: dict) -> list[dict]:
-    documents = []
-    for course in tqdm(courses, desc="Fetching FAQs for courses"):
-        url = f"{COURSES_FAQ_BASE_URL}{course['path']}"
-        course_data = fetch_data(url)
-        documents.extend(course_data)
+    documents = get_fetcher().fetch_course_faqs(courses, url_prefix=COURSES_FAQ_BASE_URL)
     return documents
 
 if __name__ == "__main__":
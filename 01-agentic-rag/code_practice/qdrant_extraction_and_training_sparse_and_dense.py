@@ -1,10 +1,9 @@
-import uuid
-
 import requests
 from config import COURSES_URL, QDRANT_HOST, MODEL_HANDLE, EMBEDDING_DIMENSIONALITY, COLLECTION_NAME
 from data_ingestion import fetch_data, fetch_course_faqs
 from qdrant_client import models
-from utility_functions import QdrantVectorStore
+from incremental_sync import content_hash
+from utility_functions import QdrantVectorStore, sync_points
 
 
 def fetch_docs(url: str):
@@ -13,31 +12,30 @@ def fetch_docs(url: str):
 
 
 def upsert_documents(client, collection_name: str, model_handle_dense: str, model_handle_sparse: str, documents: list):
-    client.upsert(
-        collection_name=collection_name,
-        points=[
-            models.PointStruct(
-                id=uuid.uuid4().hex,
-                vector={
-                    "jina-small": models.Document(
-                        text=doc["answer"],
-                        model=model_handle_dense
-                        ),
-                    "bm25": models.Document(
-                        text=doc["answer"],
-                        model=model_handle_sparse
-                        )
-                    },
-                payload={
-                    "text": doc["answer"],
-                    "section": doc["section"],
-                    "course": doc['course'],
-                    "question": doc['question']
-                }
-            )
-        for doc in documents
-        ]
-    )
+    def build_point(doc: dict, point_id: str) -> models.PointStruct:
+        return models.PointStruct(
+            id=point_id,
+            vector={
+                "jina-small": models.Document(
+                    text=doc["answer"],
+                    model=model_handle_dense
+                    ),
+                "bm25": models.Document(
+                    text=doc["answer"],
+                    model=model_handle_sparse
+                    )
+                },
+            payload={
+                "text": doc["answer"],
+                "section": doc["section"],
+                "course": doc['course'],
+                "question": doc['question'],
+                "content_hash": content_hash(doc)
+            }
+        )
+
+    return sync_points(client, collection_name, documents, build_point,
+                       checkpoint_path=f"{collection_name}.checkpoint")
     
 
 if __name__ == "__main__":
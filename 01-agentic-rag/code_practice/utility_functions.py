@@ -1,48 +1,345 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from itertools import islice
+
 from qdrant_client import QdrantClient, models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from incremental_sync import SyncPlan, plan_sync, point_id
+
+
+@dataclass
+class CollectionPreset:
+    """Index and storage settings applied when a collection is created.
+
+    filter_fields get a keyword payload index, so filtered queries such as
+    search_by_filter do not scan every point. hnsw_m / hnsw_ef_construct
+    tune the dense HNSW graph (None keeps the Qdrant default). With
+    quantization, dense vectors are also stored as scalar int8 in RAM and
+    searches rescore the oversampled candidates with the original vectors,
+    which can then live on disk (on_disk).
+    """
+    filter_fields: tuple = ("course",)
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    quantization: bool = False
+    on_disk: bool = False
+    oversampling: float = 2.0
+
+    def hnsw_config(self) -> models.HnswConfigDiff | None:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> models.ScalarQuantization | None:
+        if not self.quantization:
+            return None
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+
+    def vector_params(self, size: int) -> models.VectorParams:
+        return models.VectorParams(size=size,
+                                   distance=models.Distance.COSINE,
+                                   hnsw_config=self.hnsw_config(),
+                                   quantization_config=self.quantization_config(),
+                                   on_disk=self.on_disk or None)
+
+    def search_params(self, hnsw_ef: int | None = None) -> models.SearchParams | None:
+        if not self.quantization and hnsw_ef is None:
+            return None
+        quantization = None
+        if self.quantization:
+            quantization = models.QuantizationSearchParams(rescore=True, oversampling=self.oversampling)
+        return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
+PRESETS = {
+    "default": CollectionPreset(filter_fields=()),
+    "filtered": CollectionPreset(),
+    "accurate": CollectionPreset(hnsw_m=32, hnsw_ef_construct=256),
+    "compact": CollectionPreset(quantization=True, on_disk=True),
+}
+
+
+def get_preset(preset) -> CollectionPreset:
+    if isinstance(preset, CollectionPreset):
+        return preset
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset {preset}, expected one of {list(PRESETS)}")
+    return PRESETS[preset]
+
 
 class QdrantVectorStore:
     def __init__(self, host: str):
         self.client = QdrantClient(url=host)
 
-    def create_collection(self, collection_name: str, embedding_dimensionality: int):
+    def create_collection(self, collection_name: str, embedding_dimensionality: int, preset="filtered"):
+        preset = get_preset(preset)
         if not self.client.collection_exists(collection_name=collection_name):
             self.client.create_collection(collection_name=collection_name,
-                                        vectors_config=models.VectorParams(
-                                            size=embedding_dimensionality,
-                                            distance=models.Distance.COSINE
-                                        )
+                                        vectors_config=preset.vector_params(embedding_dimensionality)
                                         )
         else:
             print(f"Collection {collection_name} already exists.")
+        self.create_payload_indexes(collection_name, preset.filter_fields)
 
-    def create_collection_sparse(self, collection_name: str):
+    def create_collection_sparse(self, collection_name: str, preset="filtered"):
+        preset = get_preset(preset)
         if not self.client.collection_exists(collection_name=collection_name):
             self.client.create_collection(
                 collection_name=collection_name,
                 sparse_vectors_config={
                     "bm25": models.SparseVectorParams(
-                        modifier=models.Modifier.IDF
+                        modifier=models.Modifier.IDF,
+                        index=models.SparseIndexParams(on_disk=preset.on_disk or None)
                     )
                 }
             )
         else:
             print(f"Collection {collection_name} already exists.")
+        self.create_payload_indexes(collection_name, preset.filter_fields)
             
-    def create_collection_hybrid(self, collection_name: str, embedding_dimensionality: int):
+    def create_collection_hybrid(self, collection_name: str, embedding_dimensionality: int, preset="filtered"):
+        preset = get_preset(preset)
         if not self.client.collection_exists(collection_name=collection_name):
             self.client.create_collection(
                 collection_name=collection_name,
                 vectors_config={
-                    "jina-small": models.VectorParams(
-                        size=embedding_dimensionality,
-                        distance=models.Distance.COSINE
-                    )
+                    "jina-small": preset.vector_params(embedding_dimensionality)
                 },
                 sparse_vectors_config={
                     "bm25": models.SparseVectorParams(
-                        modifier=models.Modifier.IDF
+                        modifier=models.Modifier.IDF,
+                        index=models.SparseIndexParams(on_disk=preset.on_disk or None)
                     )
                 }
             )
         else:
-            print(f"Collection {collection_name} already exists.")
\ No newline at end of file
+            print(f"Collection {collection_name} already exists.")
+        self.create_payload_indexes(collection_name, preset.filter_fields)
+
+    def create_payload_indexes(self, collection_name: str, fields):
+        """Adds a keyword payload index for every field that does not have one yet."""
+        indexed = self.client.get_collection(collection_name=collection_name).payload_schema or {}
+        for field in fields:
+            if field not in indexed:
+                self.client.create_payload_index(collection_name=collection_name,
+                                                 field_name=field,
+                                                 field_schema=models.PayloadSchemaType.KEYWORD)
+
+    def query_batch(self, collection_name: str, requests: list[models.QueryRequest],
+                    batch_size: int = 64) -> list[list[models.ScoredPoint]]:
+        """Sends query requests in chunks of batch_size, one round trip per chunk.
+
+        Returns one list of points per request, in the same order.
+        """
+        results = []
+        for start in range(0, len(requests), batch_size):
+            responses = self.client.query_batch_points(collection_name=collection_name,
+                                                       requests=requests[start:start + batch_size])
+            results.extend(response.points for response in responses)
+        return results
+
+    def search_batch(self, collection_name: str, queries: list, filters=None, limit: int = 5,
+                     using: str | None = None, batch_size: int = 64, with_payload: bool = True,
+                     search_params: models.SearchParams | None = None) -> list[list[models.ScoredPoint]]:
+        """Searches many queries at once.
+
+        queries are vectors, sparse vectors or models.Document. filters is
+        None, one filter for every query or a list aligned with queries;
+        a filter is a models.Filter or a dict like {"course": "mlops-zoomcamp"}.
+        search_params usually comes from CollectionPreset.search_params().
+        """
+        requests = [
+            models.QueryRequest(query=query,
+                                filter=query_filter,
+                                using=using,
+                                limit=limit,
+                                params=search_params,
+                                with_payload=with_payload)
+            for query, query_filter in zip(queries, align_filters(filters, len(queries)))
+        ]
+        return self.query_batch(collection_name, requests, batch_size=batch_size)
+
+    def search_hybrid_batch(self, collection_name: str, dense_queries: list, sparse_queries: list,
+                            filters=None, limit: int = 5, dense_using: str = "jina-small",
+                            sparse_using: str = "bm25", prefetch_limit: int | None = None,
+                            fusion: models.Fusion = models.Fusion.RRF, batch_size: int = 64,
+                            with_payload: bool = True,
+                            search_params: models.SearchParams | None = None) -> list[list[models.ScoredPoint]]:
+        """Batched form of the dense + sparse prefetch with server-side fusion.
+
+        search_params apply to the dense prefetch.
+        """
+        if len(dense_queries) != len(sparse_queries):
+            raise ValueError("dense_queries and sparse_queries must have the same length")
+
+        prefetch_limit = prefetch_limit or limit * 5
+        requests = [
+            models.QueryRequest(
+                prefetch=[
+                    models.Prefetch(query=dense, using=dense_using, filter=query_filter, limit=prefetch_limit,
+                                    params=search_params),
+                    models.Prefetch(query=sparse, using=sparse_using, filter=query_filter, limit=prefetch_limit),
+                ],
+                query=models.FusionQuery(fusion=fusion),
+                limit=limit,
+                with_payload=with_payload
+            )
+            for dense, sparse, query_filter in zip(dense_queries, sparse_queries,
+                                                   align_filters(filters, len(dense_queries)))
+        ]
+        return self.query_batch(collection_name, requests, batch_size=batch_size)
+
+
+def build_filter(query_filter) -> models.Filter | None:
+    if query_filter is None or isinstance(query_filter, models.Filter):
+        return query_filter
+    return models.Filter(must=[
+        models.FieldCondition(key=key, match=models.MatchValue(value=value))
+        for key, value in query_filter.items()
+    ])
+
+
+def align_filters(filters, n: int) -> list:
+    if isinstance(filters, list):
+        if len(filters) != n:
+            raise ValueError(f"Got {len(filters)} filters for {n} queries")
+        return [build_filter(f) for f in filters]
+    return [build_filter(filters)] * n
+
+
+def existing_point_ids(client, collection_name: str, batch_size: int = 1000) -> set[str | int]:
+    # the ids as Qdrant returns them, integer ids must be deleted as integers
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection_name,
+                                       limit=batch_size,
+                                       offset=offset,
+                                       with_payload=False,
+                                       with_vectors=False)
+        ids.update(point.id for point in points)
+        if offset is None:
+            return ids
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code is not None and (error.status_code == 429 or error.status_code >= 500)
+    return isinstance(error, (ResponseHandlingException, ConnectionError, TimeoutError))
+
+
+def read_checkpoint(checkpoint_path: str | None) -> set[str]:
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "rt") as f_in:
+        return {line.strip() for line in f_in if line.strip()}
+
+
+def upload_points(client, collection_name: str, documents, build_point, batch_size: int = 64,
+                  parallel: int = 4, checkpoint_path: str | None = None, max_retries: int = 3) -> dict:
+    """Streams documents to Qdrant in fixed-size batches.
+
+    documents can be any iterable, points are only built for the batches in
+    flight, so at most batch_size * parallel PointStructs are in memory.
+    Batches are sent with wait=False from up to `parallel` threads and the
+    last batch is sent with wait=True once the others are acknowledged, as
+    a barrier. Transient errors are retried with exponential backoff.
+
+    With checkpoint_path, the ids of acknowledged points are appended to
+    that file and skipped on the next run, so an interrupted upload resumes
+    where it stopped. The file is removed once the upload completes.
+    """
+    done_ids = read_checkpoint(checkpoint_path)
+    if done_ids:
+        print(f"Resuming upload to {collection_name}, {len(done_ids)} points already uploaded")
+
+    checkpoint_lock = threading.Lock()
+    checkpoint = open(checkpoint_path, "at") if checkpoint_path else None
+
+    def upsert(batch: list[dict], wait_for_result: bool) -> int:
+        points = [build_point(doc, doc_id) for doc_id, doc in batch]
+        for attempt in range(max_retries + 1):
+            try:
+                client.upsert(collection_name=collection_name, points=points, wait=wait_for_result)
+                break
+            except Exception as e:
+                if attempt == max_retries or not is_transient(e):
+                    raise
+                print(f"Upsert of {len(points)} points failed ({e}), retrying")
+                time.sleep(2 ** attempt)
+
+        if checkpoint is not None:
+            with checkpoint_lock:
+                checkpoint.writelines(f"{doc_id}\n" for doc_id, _ in batch)
+                checkpoint.flush()
+        return len(points)
+
+    pending = ((point_id(doc), doc) for doc in documents)
+    pending = ((doc_id, doc) for doc_id, doc in pending if doc_id not in done_ids)
+    batches = iter(lambda: list(islice(pending, batch_size)), [])
+
+    uploaded = 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            in_flight = set()
+            batch = next(batches, None)
+            while batch is not None:
+                next_batch = next(batches, None)
+                if next_batch is None:
+                    break
+                if len(in_flight) >= parallel:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    uploaded += sum(future.result() for future in finished)
+                in_flight.add(pool.submit(upsert, batch, False))
+                batch = next_batch
+
+            uploaded += sum(future.result() for future in in_flight)
+            if batch is not None:
+                uploaded += upsert(batch, True)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "points": uploaded,
+        "seconds": elapsed,
+        "points_per_sec": uploaded / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"Uploaded {uploaded} points to {collection_name} in {elapsed:.2f}s "
+          f"({stats['points_per_sec']:.0f} points/sec)")
+    return stats
+
+
+def sync_points(client, collection_name: str, documents: list[dict], build_point, batch_size: int = 64,
+                parallel: int = 4, checkpoint_path: str | None = None) -> SyncPlan:
+    """Upserts new or changed documents and deletes the ones that are gone.
+
+    build_point(doc, point_id) must return a models.PointStruct. Unchanged
+    documents are skipped, so they are not embedded again. New documents
+    go through upload_points.
+    """
+    plan = plan_sync(existing_point_ids(client, collection_name), documents)
+    print(f"Sync {collection_name}: {plan}")
+
+    if plan.to_upsert:
+        upload_points(client, collection_name, plan.to_upsert, build_point,
+                      batch_size=batch_size, parallel=parallel, checkpoint_path=checkpoint_path)
+    if plan.to_delete:
+        client.delete(collection_name=collection_name,
+                      points_selector=models.PointIdsList(points=plan.to_delete))
+    return plan
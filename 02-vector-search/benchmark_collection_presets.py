@@ -0,0 +1,120 @@
+import argparse
+import time
+
+import numpy as np
+import requests
+from qdrant_client import models
+
+from benchmark_vector_index import COURSES, synthetic_corpus
+from config import QDRANT_HOST
+from utility_functions import PRESETS, QdrantVectorStore, build_filter, upload_points
+
+
+def resident_memory(host: str) -> float | None:
+    """Resident memory of the Qdrant server in MB, from its Prometheus metrics."""
+    try:
+        response = requests.get(f"{host.rstrip('/')}/metrics", timeout=5)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return float(line.split()[-1]) / 1024 ** 2
+    return None
+
+
+def vector_memory(preset, n: int, dim: int) -> float:
+    """Estimated MB of vectors kept in RAM for a preset."""
+    if preset.quantization:
+        in_ram = n * dim
+        if not preset.on_disk:
+            in_ram += n * dim * 4
+        return in_ram / 1024 ** 2
+    return 0.0 if preset.on_disk else n * dim * 4 / 1024 ** 2
+
+
+def wait_until_indexed(client, collection_name: str, timeout: float = 600):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        info = client.get_collection(collection_name=collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    print(f"{collection_name} is still optimizing after {timeout:.0f}s")
+
+
+def load_collection(qv, name: str, preset, X, payloads):
+    collection_name = f"bench-{name}"
+    if qv.client.collection_exists(collection_name=collection_name):
+        qv.client.delete_collection(collection_name=collection_name)
+    qv.create_collection(collection_name, X.shape[1], preset=preset)
+
+    def build_point(doc: dict, point_id: str) -> models.PointStruct:
+        return models.PointStruct(id=point_id, vector=X[doc["id"]].tolist(), payload=doc)
+
+    upload_points(qv.client, collection_name, payloads, build_point, batch_size=256)
+    wait_until_indexed(qv.client, collection_name)
+    return collection_name
+
+
+def run(qv, collection_name: str, queries, limit: int, query_filter, search_params):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        response = qv.client.query_points(collection_name=collection_name,
+                                          query=query.tolist(),
+                                          query_filter=query_filter,
+                                          search_params=search_params,
+                                          limit=limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.id for point in response.points])
+    return results, np.array(latencies)
+
+
+def recall(results, reference):
+    return np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(results, reference)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtered query latency and RAM of Qdrant collection presets")
+    parser.add_argument("--host", default=QDRANT_HOST)
+    parser.add_argument("--presets", nargs="+", default=list(PRESETS), choices=list(PRESETS))
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--hnsw-ef", type=int, default=None)
+    args = parser.parse_args()
+
+    X, payloads = synthetic_corpus(args.n, args.dim)
+    for payload in payloads:
+        payload["question"] = f"synthetic point {payload['id']}"
+
+    rng = np.random.default_rng(2)
+    queries = X[rng.choice(len(X), size=args.queries, replace=False)] + 0.1 * rng.normal(size=(args.queries, X.shape[1]))
+    query_filter = build_filter({"course": COURSES[0]})
+
+    qv = QdrantVectorStore(host=args.host)
+    print(f"{len(X)} vectors of dim {X.shape[1]}, filter course={COURSES[0]}")
+    print(f"{'preset':>10} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{args.k}':>10} {'vectors MB':>11} {'server MB':>10}")
+
+    for name in args.presets:
+        preset = PRESETS[name]
+        before = resident_memory(args.host)
+        collection_name = load_collection(qv, name, preset, X, payloads)
+        after = resident_memory(args.host)
+
+        reference, _ = run(qv, collection_name, queries, args.k, query_filter, models.SearchParams(exact=True))
+        results, latencies = run(qv, collection_name, queries, args.k, query_filter,
+                                 preset.search_params(hnsw_ef=args.hnsw_ef))
+
+        server = f"{after - before:.0f}" if before is not None and after is not None else "n/a"
+        print(f"{name:>10} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+              f"{recall(results, reference):>10.3f} {vector_memory(preset, len(X), X.shape[1]):>11.1f} {server:>10}")
+
+        qv.client.delete_collection(collection_name=collection_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import VectorIndex
+
+COURSES = ["data-engineering-zoomcamp", "machine-learning-zoomcamp", "mlops-zoomcamp", "llm-zoomcamp"]
+
+
+def synthetic_corpus(n: int, dim: int, n_clusters: int = 64, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    X = centers[rng.integers(n_clusters, size=n)] + 0.5 * rng.normal(size=(n, dim))
+    payloads = [{"course": COURSES[i % len(COURSES)], "id": i} for i in range(n)]
+    return X.astype(np.float32), payloads
+
+
+def run(index, queries, limit, query_filter):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append([p.id for p in index.search(query, limit=limit, query_filter=query_filter)])
+    latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+    return results, latency_ms
+
+
+def recall(results, reference):
+    return np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(results, reference)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of IVF search against exact search")
+    parser.add_argument("--embeddings", default=None, help=".npy file from embed/pipeline.py, synthetic data if omitted")
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    if args.embeddings:
+        X = np.load(args.embeddings)
+        payloads = [{"course": COURSES[i % len(COURSES)], "id": i} for i in range(len(X))]
+    else:
+        X, payloads = synthetic_corpus(args.n, args.dim)
+
+    rng = np.random.default_rng(2)
+    queries = X[rng.choice(len(X), size=args.queries, replace=False)] + 0.1 * rng.normal(size=(args.queries, X.shape[1]))
+
+    start = time.perf_counter()
+    exact = VectorIndex(mode="exact").fit(X, payloads)
+    print(f"{len(X)} vectors of dim {X.shape[1]}, exact build {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    ivf = VectorIndex(mode="ivf").fit(X, payloads)
+    print(f"ivf build with {len(ivf.centroids)} lists {time.perf_counter() - start:.2f}s")
+
+    print(f"{'mode':>12} {'filter':>7} {'ms/query':>9} {f'recall@{args.k}':>10}")
+    for query_filter in [None, {"course": COURSES[0]}]:
+        label = "course" if query_filter else "none"
+        reference, latency = run(exact, queries, args.k, query_filter)
+        print(f"{'exact':>12} {label:>7} {latency:>9.3f} {1:>10.3f}")
+        for n_probe in args.n_probe:
+            ivf.n_probe = n_probe
+            results, latency = run(ivf, queries, args.k, query_filter)
+            print(f"{f'ivf/{n_probe}':>12} {label:>7} {latency:>9.3f} {recall(results, reference):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
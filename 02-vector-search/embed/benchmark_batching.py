@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from batcher import MicroBatcher
+from corpus import DEFAULT_DOCUMENTS, load_texts
+from embedder import Embedder
+
+
+def run(encode, texts, concurrency):
+    latencies = []
+
+    def call(text):
+        start = time.perf_counter()
+        encode(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, texts))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return len(texts) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput of encode() with and without micro-batching")
+    parser.add_argument("--model", default="models/Xenova/all-MiniLM-L6-v2")
+    parser.add_argument("--documents", default=DEFAULT_DOCUMENTS)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[2, 5, 10])
+    args = parser.parse_args()
+
+    embedder = Embedder(args.model)
+    random.seed(1)
+    texts = random.choices(load_texts(args.documents), k=args.requests)
+
+    print(f"{'mode':>14} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for concurrency in args.concurrency:
+        qps, p50, p95 = run(embedder.encode, texts, concurrency)
+        print(f"{'direct':>14} {concurrency:>5} {qps:>8.0f} {p50:>8.1f} {p95:>8.1f} {1:>6.1f}")
+
+        for max_wait_ms in args.max_wait_ms:
+            with MicroBatcher(embedder, args.max_batch_size, max_wait_ms) as batcher:
+                qps, p50, p95 = run(batcher.encode, texts, concurrency)
+                name = f"batch {max_wait_ms:g}ms"
+                print(f"{name:>14} {concurrency:>5} {qps:>8.0f} {p50:>8.1f} {p95:>8.1f} "
+                      f"{batcher.mean_batch_size:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import json
+from pathlib import Path
+
+DEFAULT_DOCUMENTS = Path(__file__).parent / "../../cohorts/2025/01-intro/documents.json"
+
+
+def load_texts(path=DEFAULT_DOCUMENTS):
+    with open(path) as f:
+        data = json.load(f)
+
+    # documents.json groups documents by course, the FAQ json files are flat
+    if data and "documents" in data[0]:
+        docs = [doc for course in data for doc in course["documents"]]
+    else:
+        docs = data
+
+    return [doc["question"] + " " + doc.get("answer", doc.get("text", "")) for doc in docs]
@@ -1,9 +1,12 @@
 import os
+import sys
 import shutil
 import logging
 from pathlib import Path
 from huggingface_hub import hf_hub_download, list_repo_files
 
+from embedder import MODEL_FILES
+
 os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
 logging.getLogger("huggingface_hub").setLevel(logging.ERROR)
 
@@ -13,36 +16,57 @@ ONNX_CANDIDATES = [
     "model.onnx",
 ]
 
-def download(repo, dest="models"):
-    dest = Path(dest) / repo
-    dest.mkdir(parents=True, exist_ok=True)
+VARIANT_CANDIDATES = {
+    "fp32": ONNX_CANDIDATES,
+    "int8": ["onnx/model_int8.onnx", "onnx/model_quantized.onnx"],
+    "fp16": ["onnx/model_fp16.onnx"],
+}
+
+
+def copy_file(repo, remote, dst):
+    src = hf_hub_download(repo_id=repo, filename=remote)
+    if not dst.exists():
+        shutil.copy2(src, dst)
+        print(f"  saved {dst}")
+    else:
+        print(f"  exists {dst}")
+
+
+def quantize(src, dst):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    if dst.exists():
+        print(f"  exists {dst}")
+        return
+    quantize_dynamic(str(src), str(dst), weight_type=QuantType.QInt8)
+    print(f"  quantized {dst}")
+
+
+def download(repo, dest="models", variant="fp32"):
+    if variant not in VARIANT_CANDIDATES:
+        raise ValueError(f"Unknown variant {variant}, expected one of {list(VARIANT_CANDIDATES)}")
+
+    model_dir = Path(dest) / repo
+    model_dir.mkdir(parents=True, exist_ok=True)
 
     files = list_repo_files(repo_id=repo)
-    onnx_file = next((c for c in ONNX_CANDIDATES if c in files), None)
+    onnx_file = next((c for c in VARIANT_CANDIDATES[variant] if c in files), None)
+
+    if not onnx_file and variant == "int8":
+        # not published, quantize the fp32 model ourselves
+        download(repo, dest, variant="fp32")
+        quantize(model_dir / MODEL_FILES["fp32"], model_dir / MODEL_FILES["int8"])
+        return
     if not onnx_file:
-        raise FileNotFoundError(f"No ONNX model found in {repo}")
-
-    for remote, local in [
-        ("tokenizer.json", "tokenizer.json"),
-        (onnx_file, "model.onnx"),
-    ]:
-        src = hf_hub_download(repo_id=repo, filename=remote)
-        dst = dest / local
-        if not dst.exists():
-            shutil.copy2(src, dst)
-            print(f"  saved {dst}")
-        else:
-            print(f"  exists {dst}")
+        raise FileNotFoundError(f"No {variant} ONNX model found in {repo}")
+
+    copy_file(repo, "tokenizer.json", model_dir / "tokenizer.json")
+    copy_file(repo, onnx_file, model_dir / MODEL_FILES[variant])
 
     onnx_ext = onnx_file + "_data"
     if onnx_ext in files:
-        src = hf_hub_download(repo_id=repo, filename=onnx_ext)
-        dst = dest / "model.onnx_data"
-        if not dst.exists():
-            shutil.copy2(src, dst)
-            print(f"  saved {dst}")
-        else:
-            print(f"  exists {dst}")
+        copy_file(repo, onnx_ext, model_dir / (MODEL_FILES[variant] + "_data"))
 
 if __name__ == "__main__":
-    download("Xenova/all-MiniLM-L6-v2")
+    variant = sys.argv[1] if len(sys.argv) > 1 else "fp32"
+    download("Xenova/all-MiniLM-L6-v2", variant=variant)
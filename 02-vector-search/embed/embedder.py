@@ -1,24 +1,128 @@
+import copy
+from dataclasses import dataclass
+
 import numpy as np
-import onnxruntime as ort
 from tokenizers import Tokenizer
 from pathlib import Path
 
+from session_config import SessionConfig
+
+
+MODEL_FILES = {
+    "fp32": "model.onnx",
+    "int8": "model_int8.onnx",
+    "fp16": "model_fp16.onnx",
+}
+
+
+def model_id(path, variant="fp32"):
+    path = Path(path)
+    return f"{path.parent.name}/{path.name}:{variant}"
+
+
+@dataclass
+class PaddingStats:
+    texts: int = 0
+    batches: int = 0
+    tokens: int = 0
+    padded_tokens: int = 0
+
+    @property
+    def padding_ratio(self):
+        total = self.tokens + self.padded_tokens
+        return self.padded_tokens / total if total else 0.0
+
 
 class Embedder:
-    def __init__(self, path="models/Xenova/all-MiniLM-L6-v2"):
+    def __init__(self, path="models/Xenova/all-MiniLM-L6-v2", max_length=512, variant="fp32",
+                 session_config=None):
         path = Path(path)
+        self.variant = variant
+        self.max_length = max_length
+        self.model_id = model_id(path, variant)
+        self.session_config = session_config or SessionConfig()
         self.tokenizer = Tokenizer.from_file(str(path / "tokenizer.json"))
-        self.session = ort.InferenceSession(
-            str(path / "model.onnx"), providers=["CPUExecutionProvider"]
-        )
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.pad_id, self.pad_token = self._pad_settings(self.tokenizer)
+        # batches are padded locally in _pad, the tokenizer is never switched
+        # between padding modes, so concurrent encode calls can share it
+        self.tokenizer.no_padding()
+        self.session = self.session_config.create_session(path / MODEL_FILES[variant], variant=variant)
         self.input_names = {inp.name for inp in self.session.get_inputs()}
 
     def encode(self, text, normalize=True):
         return self.encode_batch([text], normalize=normalize)[0]
 
     def encode_batch(self, texts, normalize=True):
-        self.tokenizer.enable_padding()
         encoded = self.tokenizer.encode_batch(texts)
+        return self._run(self._pad(encoded), normalize)
+
+    def encode_corpus(self, texts, batch_size=64, max_padding_ratio=0.2, normalize=True):
+        """Encodes a large list of texts with little padding.
+
+        Texts are sorted by token count and cut into batches so that pad
+        tokens stay under max_padding_ratio of each batch. Vectors come back
+        in the original order, together with token/padding stats.
+        """
+        encoded = self.tokenizer.encode_batch(texts)
+        lengths = np.array([len(e.ids) for e in encoded])
+        order = np.argsort(lengths, kind="stable")
+
+        stats = PaddingStats(texts=len(texts))
+        result = None
+        for batch in self._length_buckets(lengths, order, batch_size, max_padding_ratio):
+            longest = lengths[batch].max()
+            vectors = self._run(self._pad([encoded[i] for i in batch]), normalize)
+            if result is None:
+                result = np.zeros((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[batch] = vectors
+
+            stats.batches += 1
+            stats.tokens += int(lengths[batch].sum())
+            stats.padded_tokens += int(longest * len(batch) - lengths[batch].sum())
+
+        if result is None:
+            result = np.zeros((0, 0), dtype=np.float32)
+        return result, stats
+
+    @staticmethod
+    def _pad_settings(tokenizer):
+        # the padding configured in tokenizer.json, else the BERT [PAD] token
+        padding = tokenizer.padding
+        if padding is not None:
+            return padding["pad_id"], padding["pad_token"]
+        pad_id = tokenizer.token_to_id("[PAD]")
+        return (0 if pad_id is None else pad_id), "[PAD]"
+
+    def _pad(self, encoded):
+        """Copies of the encodings, padded to the longest one."""
+        longest = max((len(e.ids) for e in encoded), default=0)
+        padded = []
+        for e in encoded:
+            e = copy.deepcopy(e)
+            e.pad(longest, pad_id=self.pad_id, pad_token=self.pad_token)
+            padded.append(e)
+        return padded
+
+    @staticmethod
+    def _length_buckets(lengths, order, batch_size, max_padding_ratio):
+        # order is sorted by length, so the last text added is the longest
+        batch = []
+        tokens = 0
+        for i in order:
+            if batch:
+                longest = lengths[i]
+                padded = longest * (len(batch) + 1) - (tokens + lengths[i])
+                if len(batch) == batch_size or padded > max_padding_ratio * longest * (len(batch) + 1):
+                    yield np.array(batch)
+                    batch = []
+                    tokens = 0
+            batch.append(i)
+            tokens += lengths[i]
+        if batch:
+            yield np.array(batch)
+
+    def _run(self, encoded, normalize):
         feed = {}
         if "input_ids" in self.input_names:
             feed["input_ids"] = np.array([e.ids for e in encoded], dtype=np.int64)
@@ -30,7 +134,7 @@ class Embedder:
             feed["token_type_ids"] = np.array(
                 [e.type_ids for e in encoded], dtype=np.int64
             )
-        hidden = self.session.run(None, feed)[0]
+        hidden = self.session.run(None, feed)[0].astype(np.float32)
         mask = feed["attention_mask"][..., None]
         pooled = (hidden * mask).sum(axis=1) / mask.sum(axis=1)
         if normalize:
@@ -0,0 +1,112 @@
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+from corpus import DEFAULT_DOCUMENTS, load_texts
+from cache import EmbeddingCache, cache_key
+from embedder import Embedder, model_id
+from session_config import SessionConfig, available_cpus
+
+_embedder = None
+
+
+def _init_worker(model_path, variant, max_length, num_workers, worker_ids):
+    global _embedder
+    config = SessionConfig.auto(num_workers=num_workers, worker_index=worker_ids.get())
+    _embedder = Embedder(model_path, max_length=max_length, variant=variant, session_config=config)
+
+
+def _encode_shard(shard):
+    start, texts, batch_size, normalize = shard
+    vectors, _ = _embedder.encode_corpus(texts, batch_size=batch_size, normalize=normalize)
+    return start, vectors
+
+
+def embed_corpus(texts, model_path="models/Xenova/all-MiniLM-L6-v2", output_path=None,
+                 num_workers=None, shard_size=512, batch_size=64, variant="fp32", normalize=True,
+                 cache=None, max_length=512):
+    """Embeds texts with a pool of processes, one pinned Embedder per worker.
+
+    The corpus is cut into shards of shard_size texts. Results stream back
+    in order into one float32 matrix. With output_path the matrix is a
+    .npy file written in place, which load_embeddings can memory-map later.
+    With an EmbeddingCache only texts missing from it reach the workers.
+    """
+    cached = [None] * len(texts)
+    if cache is not None:
+        key = cache_key(model_id(model_path, variant), max_length, normalize)
+        cached = cache.get_many(key, texts)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+    print(f"{len(texts) - len(missing)} cached, {len(missing)} to embed")
+
+    X = None
+
+    def allocate(dim):
+        shape = (len(texts), dim)
+        if output_path:
+            return np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32, shape=shape)
+        return np.empty(shape, dtype=np.float32)
+
+    for i, vector in enumerate(cached):
+        if vector is not None:
+            if X is None:
+                X = allocate(len(vector))
+            X[i] = vector
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        missing_ids = np.array(missing)
+        for start, vectors in _embed_parallel(missing_texts, model_path, num_workers, shard_size,
+                                              batch_size, variant, normalize, max_length):
+            if X is None:
+                X = allocate(vectors.shape[1])
+            X[missing_ids[start:start + len(vectors)]] = vectors
+            if cache is not None:
+                cache.put_many(key, missing_texts[start:start + len(vectors)], vectors)
+
+    if X is None:
+        return np.zeros((0, 0), dtype=np.float32)
+    if isinstance(X, np.memmap):
+        X.flush()
+    return X
+
+
+def _embed_parallel(texts, model_path, num_workers, shard_size, batch_size, variant, normalize, max_length):
+    if num_workers is None:
+        num_workers = len(available_cpus())
+
+    shards = [
+        (start, texts[start:start + shard_size], batch_size, normalize)
+        for start in range(0, len(texts), shard_size)
+    ]
+
+    ctx = mp.get_context("spawn")
+    worker_ids = ctx.Queue()
+    for i in range(num_workers):
+        worker_ids.put(i)
+
+    with ctx.Pool(num_workers, initializer=_init_worker,
+                  initargs=(model_path, variant, max_length, num_workers, worker_ids)) as pool:
+        yield from pool.imap(_encode_shard, shards)
+
+
+def load_embeddings(path):
+    return np.load(path, mmap_mode="r")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed the FAQ corpus with several processes")
+    parser.add_argument("--model", default="models/Xenova/all-MiniLM-L6-v2")
+    parser.add_argument("--documents", default=DEFAULT_DOCUMENTS)
+    parser.add_argument("--output", default="embeddings.npy")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--variant", default="fp32")
+    parser.add_argument("--cache", default="embedding_cache.db")
+    args = parser.parse_args()
+
+    texts = load_texts(args.documents)
+    cache = EmbeddingCache(args.cache) if args.cache else None
+    X = embed_corpus(texts, args.model, args.output, num_workers=args.workers, variant=args.variant,
+                     cache=cache)
+    print(f"Saved {X.shape} embeddings to {args.output}")
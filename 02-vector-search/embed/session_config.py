@@ -0,0 +1,113 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import onnxruntime as ort
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+@dataclass
+class SessionConfig:
+    """ONNX Runtime session settings for Embedder.
+
+    0 threads means "let ONNX Runtime decide". If optimized_model_path is
+    set, the optimized graph is written next to it on first start and
+    loaded directly (with optimizations off) on later starts. The file name
+    carries a key of the source model (path, size, mtime), the variant and
+    the optimization level, so a changed model or another variant never
+    loads a stale graph. cpus pins the process to the given cores before
+    the session creates its threads.
+    """
+
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    graph_optimization_level: str = "all"
+    execution_mode: str = "sequential"
+    enable_mem_arena: bool = True
+    enable_mem_pattern: bool = True
+    optimized_model_path: str | None = None
+    cpus: list[int] | None = None
+
+    @classmethod
+    def auto(cls, num_workers=1, worker_index=0, cpus=None, **kwargs):
+        """Gives worker worker_index its own contiguous slice of the cores.
+
+        The split only depends on the core list and num_workers, so every
+        process computes the same partition without talking to the others.
+        """
+        cpus = sorted(cpus) if cpus is not None else available_cpus()
+        if num_workers > len(cpus):
+            # more workers than cores, share them round-robin
+            own = [cpus[worker_index % len(cpus)]]
+        else:
+            share, extra = divmod(len(cpus), num_workers)
+            start = worker_index * share + min(worker_index, extra)
+            own = cpus[start:start + share + (1 if worker_index < extra else 0)]
+
+        kwargs.setdefault("intra_op_num_threads", len(own))
+        kwargs.setdefault("inter_op_num_threads", 1)
+        return cls(cpus=own, **kwargs)
+
+    def pin(self):
+        if self.cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, self.cpus)
+
+    def optimized_path(self, model_path, variant=None):
+        """Where the optimized graph of model_path is cached, or None without optimized_model_path."""
+        if not self.optimized_model_path:
+            return None
+        model_path = Path(model_path).resolve()
+        stat = model_path.stat()
+        source = f"{model_path}|{stat.st_size}|{stat.st_mtime_ns}|{variant}|{self.graph_optimization_level}"
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+        path = Path(self.optimized_model_path)
+        return path.with_name(f"{path.stem}.{key}{path.suffix}")
+
+    def session_options(self, optimize=True, optimized_path=None):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_num_threads
+        options.inter_op_num_threads = self.inter_op_num_threads
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        options.enable_cpu_mem_arena = self.enable_mem_arena
+        options.enable_mem_pattern = self.enable_mem_pattern
+        if optimize:
+            options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization_level]
+            if optimized_path is not None:
+                optimized_path.parent.mkdir(parents=True, exist_ok=True)
+                options.optimized_model_filepath = str(optimized_path)
+        else:
+            options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS["disable"]
+        return options
+
+    def create_session(self, model_path, providers=("CPUExecutionProvider",), variant=None):
+        self.pin()
+        optimized_path = self.optimized_path(model_path, variant)
+        if optimized_path is not None and optimized_path.exists():
+            return ort.InferenceSession(
+                str(optimized_path),
+                sess_options=self.session_options(optimize=False),
+                providers=list(providers),
+            )
+        return ort.InferenceSession(
+            str(model_path),
+            sess_options=self.session_options(optimized_path=optimized_path),
+            providers=list(providers),
+        )
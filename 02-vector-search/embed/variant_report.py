@@ -0,0 +1,53 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from corpus import DEFAULT_DOCUMENTS, load_texts
+from embedder import Embedder
+
+
+def embed(path, variant, texts):
+    embedder = Embedder(path, variant=variant)
+    start = time.perf_counter()
+    vectors, _ = embedder.encode_corpus(texts)
+    return vectors, len(texts) / (time.perf_counter() - start)
+
+
+def top_k(X, queries, k):
+    scores = queries @ X.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare quantized model variants with fp32 on the FAQ corpus")
+    parser.add_argument("--model", default="models/Xenova/all-MiniLM-L6-v2")
+    parser.add_argument("--documents", default=DEFAULT_DOCUMENTS)
+    parser.add_argument("--variants", nargs="+", default=["int8"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = load_texts(args.documents)
+    random.seed(1)
+    query_ids = random.sample(range(len(texts)), min(args.queries, len(texts)))
+
+    X_ref, ref_speed = embed(args.model, "fp32", texts)
+    ref_top = top_k(X_ref, X_ref[query_ids], args.k)
+
+    print(f"{len(texts)} documents, {len(query_ids)} queries, recall@{args.k} against fp32")
+    print(f"{'variant':>8} {'docs/s':>8} {'speedup':>8} {'cos mean':>9} {'cos min':>8} {'recall':>7}")
+    print(f"{'fp32':>8} {ref_speed:>8.0f} {1:>8.2f} {1:>9.4f} {1:>8.4f} {1:>7.3f}")
+
+    for variant in args.variants:
+        X, speed = embed(args.model, variant, texts)
+        cosine = (X * X_ref).sum(axis=1)
+        top = top_k(X, X[query_ids], args.k)
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, ref_top)])
+        print(f"{variant:>8} {speed:>8.0f} {speed / ref_speed:>8.2f} "
+              f"{cosine.mean():>9.4f} {cosine.min():>8.4f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from incremental_sync import point_id
+
+
+@dataclass
+class Hit:
+    id: str
+    score: float
+    payload: dict
+
+
+def doc_id(doc: dict) -> str:
+    """Content-hash point id of a FAQ document, the id the Qdrant collections use.
+
+    Payloads written by the ingest scripts carry the hash itself, since
+    they have too few fields to hash again; anything else is hashed.
+    """
+    if doc.get("content_hash"):
+        return str(uuid.UUID(hex=doc["content_hash"][:32]))
+    return point_id(doc)
+
+
+def result_id(result) -> str:
+    """The id of a Qdrant / VectorIndex point, derived from its payload as for documents.
+
+    The point id is only used for points returned without a document
+    payload, it matches other retrievers when it is the content-hash id.
+    """
+    payload = result.payload or {}
+    if payload.get("content_hash") or payload.get("answer") or payload.get("text"):
+        return doc_id(payload)
+    return str(result.id)
+
+
+def to_hits(results) -> list[Hit]:
+    """Converts retriever output to Hits.
+
+    Accepts Qdrant / VectorIndex points (id, score, payload) and plain
+    documents as returned by minsearch or BM25Index. Documents have no
+    score, so they get 1 / rank. Hits are keyed by the content-hash point
+    id so the same FAQ entry matches across retrievers.
+    """
+    if hasattr(results, "points"):
+        results = results.points
+
+    hits = []
+    seen = set()
+    for rank, result in enumerate(results, start=1):
+        if isinstance(result, dict):
+            hit = Hit(id=doc_id(result), score=1.0 / rank, payload=result)
+        else:
+            hit = Hit(id=result_id(result), score=float(result.score), payload=result.payload or {})
+        # results are ranked, so the first occurrence of an id is its best one
+        if hit.id not in seen:
+            seen.add(hit.id)
+            hits.append(hit)
+    return hits
+
+
+def rrf(result_lists: dict, weights: dict, k: int = 60) -> dict:
+    scores = {}
+    for name, hits in result_lists.items():
+        for rank, hit in enumerate(hits, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + weights.get(name, 1.0) / (k + rank)
+    return scores
+
+
+def _fuse_normalized(result_lists: dict, weights: dict, normalize) -> dict:
+    scores = {}
+    for name, hits in result_lists.items():
+        if not hits:
+            continue
+        normalized = normalize(np.array([hit.score for hit in hits], dtype=np.float64))
+        for hit, score in zip(hits, normalized):
+            scores[hit.id] = scores.get(hit.id, 0.0) + weights.get(name, 1.0) * float(score)
+    return scores
+
+
+def min_max(scores):
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def distribution(scores):
+    # distribution-based score fusion: mean +- 3 std mapped to [0, 1]
+    mean, std = scores.mean(), scores.std()
+    if std == 0:
+        return np.full_like(scores, 0.5)
+    low, high = mean - 3 * std, mean + 3 * std
+    return np.clip((scores - low) / (high - low), 0.0, 1.0)
+
+
+def weighted(result_lists: dict, weights: dict) -> dict:
+    return _fuse_normalized(result_lists, weights, min_max)
+
+
+def dbsf(result_lists: dict, weights: dict) -> dict:
+    return _fuse_normalized(result_lists, weights, distribution)
+
+
+FUSION_METHODS = {
+    "rrf": rrf,
+    "weighted": weighted,
+    "dbsf": dbsf,
+}
+
+
+class HybridSearch:
+    """Runs several retrievers in parallel and fuses their rankings.
+
+    retrievers maps a name to a callable (query, limit) -> results, for
+    example a BM25Index search, a VectorIndex search and a Qdrant sparse
+    query. They run concurrently, so latency is that of the slowest one.
+    method is "rrf", "weighted" (min-max normalized scores) or "dbsf"
+    (distribution-based). Documents are deduplicated by id.
+    """
+
+    def __init__(self, retrievers: dict, method: str = "rrf", weights: dict | None = None,
+                 rrf_k: int = 60, max_workers: int | None = None):
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method {method}, expected one of {list(FUSION_METHODS)}")
+        self.retrievers = retrievers
+        self.method = method
+        self.weights = weights or {}
+        self.rrf_k = rrf_k
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(retrievers))
+
+    def retrieve(self, query: str, limit: int) -> dict:
+        futures = {
+            name: self._pool.submit(retriever, query, limit)
+            for name, retriever in self.retrievers.items()
+        }
+        return {name: to_hits(future.result()) for name, future in futures.items()}
+
+    def fuse(self, result_lists: dict, limit: int) -> list[Hit]:
+        if self.method == "rrf":
+            scores = rrf(result_lists, self.weights, k=self.rrf_k)
+        else:
+            scores = FUSION_METHODS[self.method](result_lists, self.weights)
+
+        payloads = {}
+        for hits in result_lists.values():
+            for hit in hits:
+                payloads.setdefault(hit.id, hit.payload)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [Hit(id=hit_id, score=score, payload=payloads[hit_id]) for hit_id, score in ranked]
+
+    def search(self, query: str, limit: int = 5, candidates: int | None = None) -> list[Hit]:
+        """Fetches candidates (default 5 * limit) from every retriever and fuses them."""
+        result_lists = self.retrieve(query, candidates or limit * 5)
+        return self.fuse(result_lists, limit)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
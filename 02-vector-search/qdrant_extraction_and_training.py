@@ -1,6 +1,7 @@
 import requests
 from qdrant_client import models
-from utility_functions import QdrantVectorStore
+from incremental_sync import content_hash
+from utility_functions import QdrantVectorStore, sync_points
 from config import QDRANT_HOST, DOCS_URL, EMBEDDING_DIMENSIONALITY, MODEL_HANDLE, COLLECTION_NAME
 
 
@@ -9,25 +10,25 @@ def fetch_docs(url: str):
     return response.json()
 
 
+def flatten_documents(documents: list) -> list[dict]:
+    return [{**doc, "course": course["course"]} for course in documents for doc in course["documents"]]
+
+
 def upsert_documents(client, collection_name: str, documents: list, model_handle: str = MODEL_HANDLE):
-    points = []
-    id = 0
-    for course in documents:
-        for doc in course['documents']:
-            point = models.PointStruct(
-                id=id,
-                vector=models.Document(text=str(doc['text']), model=model_handle),
-                payload={
-                    "text": doc["text"],
-                    "section": doc["section"],
-                    "course": course['course']
-                }
-            )
-            points.append(point)
-            id += 1
-
-    client.upsert(collection_name=collection_name,
-                        points=points)
+    def build_point(doc: dict, point_id: str) -> models.PointStruct:
+        return models.PointStruct(
+            id=point_id,
+            vector=models.Document(text=str(doc['text']), model=model_handle),
+            payload={
+                "text": doc["text"],
+                "section": doc["section"],
+                "course": doc['course'],
+                "content_hash": content_hash(doc)
+            }
+        )
+
+    return sync_points(client, collection_name, flatten_documents(documents), build_point,
+                       checkpoint_path=f"{collection_name}.checkpoint")
     
 
 if __name__ == "__main__":
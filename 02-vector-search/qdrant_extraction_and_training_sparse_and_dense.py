@@ -1,9 +1,8 @@
-import uuid
-
 import requests
 from config import DOCS_URL, QDRANT_HOST
 from qdrant_client import models
-from utility_functions import QdrantVectorStore
+from incremental_sync import content_hash
+from utility_functions import QdrantVectorStore, sync_points
 
 
 def fetch_docs(url: str):
@@ -11,31 +10,34 @@ def fetch_docs(url: str):
     return response.json()
 
 
+def flatten_documents(documents: list) -> list[dict]:
+    return [{**doc, "course": course["course"]} for course in documents for doc in course["documents"]]
+
+
 def upsert_documents(client, collection_name: str, model_handle_dense: str, model_handle_sparse: str, documents: list):
-    client.upsert(
-        collection_name=collection_name,
-        points=[
-            models.PointStruct(
-                id=uuid.uuid4().hex,
-                vector={
-                    "jina-small": models.Document(
-                        text=doc["text"],
-                        model=model_handle_dense
-                        ),
-                    "bm25": models.Document(
-                        text=doc["text"],
-                        model=model_handle_sparse
-                        )
-                    },
-                payload={
-                    "text": doc["text"],
-                    "section": doc["section"],
-                    "course": course['course']
-                }
-            )
-        for course in documents for doc in course["documents"]
-        ]
-    )
+    def build_point(doc: dict, point_id: str) -> models.PointStruct:
+        return models.PointStruct(
+            id=point_id,
+            vector={
+                "jina-small": models.Document(
+                    text=doc["text"],
+                    model=model_handle_dense
+                    ),
+                "bm25": models.Document(
+                    text=doc["text"],
+                    model=model_handle_sparse
+                    )
+                },
+            payload={
+                "text": doc["text"],
+                "section": doc["section"],
+                "course": doc['course'],
+                "content_hash": content_hash(doc)
+            }
+        )
+
+    return sync_points(client, collection_name, flatten_documents(documents), build_point,
+                       checkpoint_path=f"{collection_name}.checkpoint")
     
 
 if __name__ == "__main__":
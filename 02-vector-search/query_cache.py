@@ -0,0 +1,79 @@
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(f"[{re.escape(string.punctuation)}]")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips punctuation and collapses whitespace."""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """In-process LRU cache for query embeddings with a TTL.
+
+    Entries are keyed by (model, query). With normalize=True the query is
+    normalized first, so "Can I join?" and "can i join" share one entry,
+    and the normalized form is what gets embedded: the cached vector does
+    not depend on which spelling arrived first.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, normalize: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.normalize = normalize
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, model: str, query: str):
+        return model, normalize_query(query) if self.normalize else query
+
+    def get(self, model: str, query: str, embed):
+        """Returns the cached embedding or embeds the (normalized) query and stores the result."""
+        key = self._key(model, query)
+        _, text = key
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, vector = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+
+        vector = embed(text)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
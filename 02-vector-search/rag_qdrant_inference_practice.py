@@ -7,14 +7,38 @@ from utility_functions import QdrantVectorStore
 from qdrant_client import models
 from openai import OpenAI
 from config import QDRANT_HOST, COLLECTION_NAME, MODEL_HANDLE
+from query_cache import QueryEmbeddingCache
+
+QUERY_CACHE = QueryEmbeddingCache(maxsize=4096, ttl=24 * 3600)
+_embedding_models = {}
+
+
+def embed_dense(query: str, model_handle: str = MODEL_HANDLE) -> list[float]:
+    def embed(text):
+        from fastembed import TextEmbedding
+
+        if model_handle not in _embedding_models:
+            _embedding_models[model_handle] = TextEmbedding(model_handle)
+        return next(_embedding_models[model_handle].query_embed(text)).tolist()
+
+    return QUERY_CACHE.get(model_handle, query, embed)
+
+
+def embed_sparse(query: str, model_handle: str = "Qdrant/bm25") -> models.SparseVector:
+    def embed(text):
+        from fastembed import SparseTextEmbedding
+
+        if model_handle not in _embedding_models:
+            _embedding_models[model_handle] = SparseTextEmbedding(model_handle)
+        embedding = next(_embedding_models[model_handle].query_embed(text))
+        return models.SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
+
+    return QUERY_CACHE.get(model_handle, query, embed)
 
 
 def search(query, collection_name, model_handle, limit:int=1):
     results = client.query_points(collection_name=collection_name,
-                                  query=models.Document(
-                                      text=query,
-                                      model=model_handle
-                                  ),
+                                  query=embed_dense(query, model_handle),
                                   limit=limit,
                                   with_payload=True
                                  )
@@ -30,10 +54,7 @@ def search_by_filter(query,
                      model_handle: str=MODEL_HANDLE,
                      limit:int=1):
     results = client.query_points(collection_name=collection_name,
-                                  query=models.Document(
-                                      text=query,
-                                      model=model_handle
-                                  ),
+                                  query=embed_dense(query, model_handle),
                                   query_filter=models.Filter(
                                       must=[
                                           models.FieldCondition(
@@ -52,10 +73,7 @@ def search_sparse(query: str, client, collection_name: str, limit: int=1) -> lis
 
     results = client.query_points(
         collection_name=collection_name,
-        query=models.Document(
-            text=query,
-            model="Qdrant/bm25"
-        ),
+        query=embed_sparse(query, "Qdrant/bm25"),
         limit=limit,
         with_payload=True,
         using="bm25"
@@ -68,18 +86,12 @@ def search_multi_stage_sparse_and_dense(query: str, client, collection_name, lim
         collection_name=collection_name,
         prefetch=[
             models.Prefetch(
-                query=models.Document(
-                    text=query,
-                    model="jinaai/jina-embeddings-v2-small-en"
-                ),
+                query=embed_dense(query, "jinaai/jina-embeddings-v2-small-en"),
                 using='jina-small',
                 limit=(limit*5)
             )
         ],
-        query=models.Document(
-            text=query,
-            model="Qdrant/bm25"
-        ),
+        query=embed_sparse(query, "Qdrant/bm25"),
         limit=limit,
         using="bm25",
         with_payload=True
@@ -92,18 +104,12 @@ def search_hybrid(query: str, client, collection_name: str, limit: int=1) -> lis
         collection_name=collection_name,
         prefetch=[
             models.Prefetch(
-                query=models.Document(
-                    text=query,
-                    model="jinaai/jina-embeddings-v2-small-en"
-                ),
+                query=embed_dense(query, "jinaai/jina-embeddings-v2-small-en"),
                 using='jina-small',
                 limit=(limit*5)
             ),
             models.Prefetch(
-                query=models.Document(
-                    text=query,
-                    model="Qdrant/bm25"
-                ),
+                query=embed_sparse(query, "Qdrant/bm25"),
                 using="bm25",
                 limit=(limit*5)
             )
@@ -260,3 +266,4 @@ if __name__ == "__main__":
     print(query)
     print()
     print(client_response)
+    print(QUERY_CACHE.stats())
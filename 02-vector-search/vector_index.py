@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+
+@dataclass
+class ScoredPoint:
+    id: int
+    score: float
+    payload: dict
+
+
+class VectorIndex:
+    """Embedded dense vector index, a local alternative to a Qdrant collection.
+
+    Vectors live in one contiguous float32 matrix and are compared with
+    cosine similarity. In "exact" mode a query is a single matmul over all
+    vectors. In "ivf" mode the vectors are clustered with k-means and a
+    query only scans the n_probe closest clusters.
+    """
+
+    def __init__(self, mode: str = "exact", n_lists: int | None = None, n_probe: int = 8,
+                 filter_fields: tuple = ("course",)):
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown mode {mode}, expected 'exact' or 'ivf'")
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.filter_fields = list(filter_fields)
+
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.payloads = []
+        self.keyword_masks = {}
+        self.centroids = None
+        self.list_offsets = None
+        self.list_ids = None
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def fit(self, vectors, payloads: list[dict], seed: int = 1):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.payloads = list(payloads)
+        self._build_keyword_masks()
+
+        if self.mode == "ivf":
+            n_lists = self.n_lists or max(1, int(np.sqrt(len(self.vectors))))
+            self.centroids, assignments = kmeans(self.vectors, n_lists, seed=seed)
+            self._build_lists(assignments)
+        return self
+
+    def _build_keyword_masks(self):
+        self.keyword_masks = {}
+        for field in self.filter_fields:
+            values = np.array([payload.get(field) for payload in self.payloads], dtype=object)
+            self.keyword_masks[field] = {value: values == value for value in set(values)}
+
+    def _build_lists(self, assignments):
+        # inverted lists stored CSR-style: ids sorted by cluster plus offsets
+        self.list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    def _filter_mask(self, query_filter: dict | None):
+        if not query_filter:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for field, value in query_filter.items():
+            masks = self.keyword_masks[field]
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            field_mask = np.zeros(len(self), dtype=bool)
+            for v in values:
+                if v in masks:
+                    field_mask |= masks[v]
+            mask &= field_mask
+        return mask
+
+    def _candidates(self, query):
+        if self.mode == "exact":
+            return None
+        n_probe = min(self.n_probe, len(self.centroids))
+        closest = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        return np.concatenate([
+            self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in closest
+        ])
+
+    def search(self, query_vector, limit: int = 5, query_filter: dict | None = None,
+               with_payload: bool = True) -> list[ScoredPoint]:
+        """Returns the limit closest points, optionally filtered by payload keywords.
+
+        query_filter works like the course filter in search_by_filter, e.g.
+        {"course": "mlops-zoomcamp"}. A list value matches any of its items.
+        """
+        if len(self) == 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+
+        ids = self._candidates(query)
+        mask = self._filter_mask(query_filter)
+        if mask is not None:
+            ids = np.flatnonzero(mask) if ids is None else ids[mask[ids]]
+
+        scores = self.vectors @ query if ids is None else self.vectors[ids] @ query
+        if ids is None:
+            ids = np.arange(len(self))
+        if len(ids) == 0:
+            return []
+
+        k = min(limit, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            ScoredPoint(id=int(ids[i]), score=float(scores[i]),
+                        payload=self.payloads[ids[i]] if with_payload else None)
+            for i in top
+        ]
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        np.save(tmp_path / "vectors.npy", self.vectors)
+        if self.mode == "ivf":
+            np.save(tmp_path / "centroids.npy", self.centroids)
+            np.save(tmp_path / "list_ids.npy", self.list_ids)
+            np.save(tmp_path / "list_offsets.npy", self.list_offsets)
+
+        meta = {
+            "mode": self.mode,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "filter_fields": self.filter_fields,
+        }
+        with open(tmp_path / "meta.json", "wt") as f_out:
+            json.dump(meta, f_out)
+        with open(tmp_path / "payloads.json", "wt") as f_out:
+            json.dump(self.payloads, f_out)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Opens a saved index with the vectors memory-mapped read-only."""
+        path = Path(path)
+        with open(path / "meta.json", "rt") as f_in:
+            meta = json.load(f_in)
+
+        index = cls(mode=meta["mode"], n_lists=meta["n_lists"], n_probe=meta["n_probe"],
+                    filter_fields=meta["filter_fields"])
+        index.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        with open(path / "payloads.json", "rt") as f_in:
+            index.payloads = json.load(f_in)
+        index._build_keyword_masks()
+
+        if index.mode == "ivf":
+            index.centroids = np.load(path / "centroids.npy", mmap_mode="r")
+            index.list_ids = np.load(path / "list_ids.npy", mmap_mode="r")
+            index.list_offsets = np.load(path / "list_offsets.npy", mmap_mode="r")
+        return index
+
+
+def kmeans(X, k: int, n_iter: int = 20, seed: int = 1):
+    """Spherical k-means over unit vectors, returns (centroids, assignments)."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(X))
+    centroids = X[rng.choice(len(X), size=k, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = np.argmax(X @ centroids.T, axis=1)
+        for c in range(k):
+            members = X[assignments == c]
+            if len(members) == 0:
+                # empty cluster, restart it on a random point
+                centroids[c] = X[rng.integers(len(X))]
+                continue
+            centroid = members.sum(axis=0)
+            centroids[c] = centroid / (np.linalg.norm(centroid) or 1)
+
+    assignments = np.argmax(X @ centroids.T, axis=1)
+    return centroids.astype(np.float32), assignments
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from retry_policy import DEFAULT_POLICY, without_client_retries
+
+
+BATCH_ENDPOINT = "/v1/responses"
+MAX_REQUESTS_PER_BATCH = 50_000
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# final statuses without results to collect, such batches are submitted again
+RESUBMIT_STATUSES = {"failed", "expired", "cancelled"}
+MANIFEST_FILE = "batches.json"
+
+
+def strict_json_schema(schema):
+    """Makes a pydantic JSON schema valid for structured outputs in strict mode.
+
+    Strict mode wants every object closed (additionalProperties false) with
+    all of its properties required. Like the SDK, null defaults are dropped.
+    """
+    schema = dict(schema)
+    if "default" in schema and schema["default"] is None:
+        del schema["default"]
+
+    if schema.get("type") == "object" and "additionalProperties" not in schema:
+        schema["additionalProperties"] = False
+    if "properties" in schema:
+        properties = schema["properties"]
+        schema["properties"] = {name: strict_json_schema(s) for name, s in properties.items()}
+        schema["required"] = list(properties)
+    if "items" in schema:
+        schema["items"] = strict_json_schema(schema["items"])
+    for key in ("anyOf", "allOf", "oneOf"):
+        if key in schema:
+            schema[key] = [strict_json_schema(s) for s in schema[key]]
+    if "$defs" in schema:
+        schema["$defs"] = {name: strict_json_schema(s) for name, s in schema["$defs"].items()}
+    return schema
+
+
+def text_format(output_type):
+    """The text.format parameter responses.parse sends for a pydantic output_type."""
+    return {
+        "type": "json_schema",
+        "name": output_type.__name__,
+        "schema": strict_json_schema(output_type.model_json_schema()),
+        "strict": True,
+    }
+
+
+def build_request(custom_id, instructions, user_prompt, output_type, model="gpt-5.4-mini"):
+    """One line of a batch file, the batch equivalent of llm_structured."""
+    return {
+        "custom_id": str(custom_id),
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "input": [
+                {"role": "developer", "content": instructions},
+                {"role": "user", "content": user_prompt}
+            ],
+            "text": {"format": text_format(output_type)},
+        },
+    }
+
+
+def write_batch_file(path, requests):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wt") as f_out:
+        for request in requests:
+            f_out.write(json.dumps(request) + "\n")
+    return path
+
+
+def submit_batch(client, path, description=None):
+    # only DEFAULT_POLICY retries, client retries on top could upload twice;
+    # a Path is read again on every attempt, an open file only once
+    client = without_client_retries(client)
+    input_file = DEFAULT_POLICY.call(client.files.create, file=Path(path), purpose="batch")
+
+    metadata = {"description": description} if description else None
+    batch = DEFAULT_POLICY.call(
+        client.batches.create,
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata=metadata,
+    )
+    print(f"Submitted batch {batch.id} from {path}")
+    return batch
+
+
+def wait_for_batch(client, batch_id, poll_interval=30, timeout=None):
+    start = time.time()
+    while True:
+        batch = DEFAULT_POLICY.call(client.batches.retrieve, batch_id)
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id}: {batch.status}, "
+                  f"{counts.completed}/{counts.total} done, {counts.failed} failed")
+        else:
+            print(f"Batch {batch_id}: {batch.status}")
+
+        if batch.status in FINAL_STATUSES:
+            return batch
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError(f"Batch {batch_id} is still {batch.status} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def file_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def read_manifest(batch_dir):
+    path = Path(batch_dir) / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def write_manifest(batch_dir, manifest):
+    path = Path(batch_dir) / MANIFEST_FILE
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+
+
+def submit_or_attach(client, path, manifest, description=None):
+    """Submits the batch file, or returns the batch already submitted from the same content.
+
+    A batch that failed, expired or was cancelled is submitted again.
+    manifest maps file names to {"digest", "batch_id"} and is updated in place.
+    """
+    path = Path(path)
+    digest = file_digest(path)
+    entry = manifest.get(path.name)
+    if entry is not None and entry["digest"] == digest:
+        batch = DEFAULT_POLICY.call(client.batches.retrieve, entry["batch_id"])
+        if batch.status not in RESUBMIT_STATUSES:
+            print(f"Reattached to batch {batch.id} ({batch.status}) for {path}")
+            return batch
+        print(f"Batch {batch.id} for {path} is {batch.status}, submitting it again")
+
+    batch = submit_batch(client, path, description=description)
+    manifest[path.name] = {"digest": digest, "batch_id": batch.id}
+    return batch
+
+
+def read_file_lines(client, file_id):
+    if file_id is None:
+        return []
+    content = DEFAULT_POLICY.call(client.files.content, file_id)
+    return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+
+def output_text(response_body):
+    parts = []
+    for item in response_body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content["text"])
+    return "".join(parts)
+
+
+def parse_results(lines, output_type):
+    """Parses batch output lines into output_type.
+
+    Returns:
+        tuple: ({custom_id: (parsed, usage)}, {custom_id: error message}).
+        usage is a plain dict, calc_price accepts it directly.
+    """
+    parsed = {}
+    errors = {}
+
+    for line in lines:
+        custom_id = line["custom_id"]
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            errors[custom_id] = json.dumps(line.get("error") or response.get("body"))
+            continue
+
+        body = response["body"]
+        try:
+            parsed[custom_id] = (output_type.model_validate_json(output_text(body)), body["usage"])
+        except ValueError as e:
+            errors[custom_id] = f"Could not parse the output as {output_type.__name__}: {e}"
+
+    return parsed, errors
+
+
+def run_batch(
+    client,
+    records,
+    instructions,
+    build_prompt,
+    output_type,
+    batch_dir,
+    custom_id=None,
+    model="gpt-5.4-mini",
+    poll_interval=30,
+):
+    """Runs llm_structured over all records through the Batch API.
+
+    build_prompt(record) returns the user prompt and custom_id(record) a
+    unique id (the position in records by default); results are joined
+    back to their records by that id. Requests are split into files of at
+    most MAX_REQUESTS_PER_BATCH lines written to batch_dir, and all batches
+    are submitted before polling.
+
+    The id of every submitted batch is saved in batch_dir/batches.json
+    together with a hash of its file. Running again with the same records
+    (e.g. after the kernel died during the wait) reattaches to those
+    batches instead of paying for them twice. Changed requests are
+    submitted as new batches; delete batches.json to force a resubmit.
+
+    Returns:
+        tuple: (results, failures), results as (record, parsed, usage) in
+        the order of records, failures as {"record", "error"} dicts.
+    """
+    ids = [str(custom_id(record)) if custom_id else str(i) for i, record in enumerate(records)]
+    if len(set(ids)) != len(ids):
+        raise ValueError("custom ids must be unique")
+    by_id = dict(zip(ids, records))
+
+    requests = [
+        build_request(i, instructions, build_prompt(record), output_type, model=model)
+        for i, record in zip(ids, records)
+    ]
+
+    manifest = read_manifest(batch_dir)
+    batches = []
+    for n, start in enumerate(range(0, len(requests), MAX_REQUESTS_PER_BATCH)):
+        path = write_batch_file(Path(batch_dir) / f"batch_{n:03d}.jsonl",
+                                requests[start:start + MAX_REQUESTS_PER_BATCH])
+        batches.append(submit_or_attach(client, path, manifest, description=output_type.__name__))
+        # saved after every submit, so a crash in between loses no batch id
+        write_manifest(batch_dir, manifest)
+
+    parsed = {}
+    errors = {}
+    for batch in batches:
+        batch = wait_for_batch(client, batch.id, poll_interval=poll_interval)
+        lines = read_file_lines(client, batch.output_file_id) + read_file_lines(client, batch.error_file_id)
+        batch_parsed, batch_errors = parse_results(lines, output_type)
+        parsed.update(batch_parsed)
+        errors.update(batch_errors)
+
+    results = []
+    failures = []
+    for i in ids:
+        if i in parsed:
+            results.append((by_id[i], *parsed[i]))
+        else:
+            failures.append({"record": by_id[i], "error": errors.get(i, "no result in the batch output")})
+
+    if failures:
+        print(f"{len(failures)} of {len(ids)} requests failed")
+    return results, failures
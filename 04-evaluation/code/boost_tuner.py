@@ -0,0 +1,207 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from search_metrics import evaluate, per_query_scores, relevance_matrix
+
+
+MISSING = -2  # code of a ground-truth document that is not in the index, never matches
+
+
+@dataclass
+class CandidateCache:
+    """Per-field scores of the top candidates of every ground-truth question.
+
+    candidates holds document positions of shape (queries, C), padded with
+    -1, and scores the matching (queries, C, fields) array of field scores.
+    Results are compared through integer codes of the document ids.
+    """
+    fields: list
+    candidates: np.ndarray
+    scores: np.ndarray
+    doc_codes: np.ndarray
+    relevant: np.ndarray
+
+    def weights(self, boost_dict):
+        # same default as Index.search: fields without a boost count once
+        return np.array([boost_dict.get(field, 1.0) for field in self.fields], dtype=np.float64)
+
+    def ranked(self, weights, k=5):
+        """Codes of the top k documents per query for one weight vector, -1 where there are fewer results."""
+        combined = self.scores @ weights
+        order = np.argsort(-combined, axis=1, kind="stable")[:, :k]
+        top_scores = np.take_along_axis(combined, order, axis=1)
+        positions = np.take_along_axis(self.candidates, order, axis=1)
+        return np.where(top_scores > 0, self.doc_codes[positions], -1)
+
+    def relevance(self, weights, k=5):
+        return relevance_matrix(self.ranked(weights, k=k), self.relevant)
+
+    def score(self, weights, k=5, metric="mrr"):
+        return float(per_query_scores(self.relevance(weights, k=k), metric).mean())
+
+    def evaluate(self, boost_dict, k=5):
+        """All search_metrics for a boost_dict, as evaluate() on the full search would report them."""
+        return evaluate(self.relevance(self.weights(boost_dict), k=k))
+
+
+def build_candidate_cache(index, ground_truth, num_candidates=50, id_field="id", question_field="question",
+                          document_field="document", batch_size=256):
+    """Scores every ground-truth question once per text field of a minsearch Index.
+
+    The candidates of a question are the union of its top num_candidates
+    documents of every field. With non-negative boosts a document outside
+    all of them can only reach the top k if it is close behind in several
+    fields, so the cache matches the full search unless num_candidates is
+    very small.
+    """
+    fields = list(index.text_fields)
+    questions = [q[question_field] for q in ground_truth]
+    n_docs = len(index.docs)
+    n_top = min(num_candidates, n_docs)
+
+    codes = {}
+    doc_codes = np.array([codes.setdefault(doc[id_field], len(codes)) for doc in index.docs], dtype=np.int64)
+    relevant = np.array([codes.get(q[document_field], MISSING) for q in ground_truth], dtype=np.int64)
+
+    candidates = np.full((len(questions), n_top * len(fields)), -1, dtype=np.int64)
+    scores = np.zeros((len(questions), n_top * len(fields), len(fields)))
+
+    for start in range(0, len(questions), batch_size):
+        batch = questions[start:start + batch_size]
+        # (batch, docs, fields), the same cosine similarities Index.search sums up
+        field_scores = np.stack([
+            cosine_similarity(index.vectorizers[field].transform(batch), index.text_matrices[field])
+            for field in fields
+        ], axis=-1)
+        top = np.argpartition(-field_scores, n_top - 1, axis=1)[:, :n_top, :]
+
+        for i in range(len(batch)):
+            positions = np.unique(top[i])
+            positions = positions[field_scores[i, positions].sum(axis=1) > 0]
+            candidates[start + i, :len(positions)] = positions
+            scores[start + i, :len(positions)] = field_scores[i, positions]
+
+    return CandidateCache(fields, candidates, scores, doc_codes, relevant)
+
+
+def _log_density(points, x, bandwidth):
+    # log of a Gaussian kernel density estimate, up to a constant
+    diff = (x[:, None, :] - points[None, :, :]) / bandwidth
+    log_kernels = -0.5 * (diff ** 2).sum(axis=-1)
+    top = log_kernels.max(axis=1, keepdims=True)
+    return top[:, 0] + np.log(np.exp(log_kernels - top).sum(axis=1)) - np.log(len(points))
+
+
+_worker_cache = None
+
+
+def _init_worker(cache):
+    global _worker_cache
+    _worker_cache = cache
+
+
+def _score_many(weights, k, metric):
+    return [_worker_cache.score(w, k=k, metric=metric) for w in weights]
+
+
+class BoostTuner:
+    """Searches boost weights over a CandidateCache in a process pool.
+
+    Every trial is a weighted sum over the cached scores, so thousands of
+    boost_dicts are evaluated in the time of one pass of full searches.
+    Weights are sampled log-uniformly from [low, high]; only their ratios
+    change the ranking. Each worker receives the cache once, when the pool
+    starts, and processes=1 evaluates in the current process.
+    """
+
+    def __init__(self, cache, k=5, metric="mrr", low=0.05, high=20.0, processes=None, seed=1):
+        self.cache = cache
+        self.k = k
+        self.metric = metric
+        self.bounds = np.log([low, high])
+        self.processes = processes or os.cpu_count()
+        self.rng = np.random.default_rng(seed)
+        self.trials = []
+
+        self.pool = None
+        if self.processes > 1:
+            self.pool = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(cache,))
+
+    def score_many(self, weights):
+        """Scores a (trials, fields) array of weights and records the trials."""
+        weights = np.asarray(weights, dtype=np.float64)
+        if self.pool is None:
+            scores = [self.cache.score(w, k=self.k, metric=self.metric) for w in weights]
+        else:
+            chunks = [chunk for chunk in np.array_split(weights, self.processes) if len(chunk)]
+            futures = [self.pool.submit(_score_many, chunk, self.k, self.metric) for chunk in chunks]
+            scores = [score for future in futures for score in future.result()]
+
+        self.trials.extend(zip(weights, scores))
+        return scores
+
+    def _sample(self, n):
+        return self.rng.uniform(*self.bounds, size=(n, len(self.cache.fields)))
+
+    def random_search(self, n_trials=500):
+        return self.score_many(np.exp(self._sample(n_trials)))
+
+    def tpe_search(self, n_trials=500, n_initial=100, batch_size=32, gamma=0.15, n_samples=1000):
+        """Bayesian search with a tree-structured Parzen estimator.
+
+        Past trials are split into the best gamma share and the rest, each
+        modelled as a kernel density in log space. Every round samples
+        n_samples points around the best trials and evaluates, spread over
+        the pool, the batch_size most likely to be good rather than bad.
+        """
+        if len(self.trials) < n_initial:
+            n = min(n_initial - len(self.trials), n_trials)
+            self.random_search(n)
+            n_trials -= n
+
+        while n_trials > 0:
+            x = np.log([w for w, _ in self.trials])
+            y = np.array([s for _, s in self.trials])
+            order = np.argsort(-y, kind="stable")
+            n_good = max(1, int(np.ceil(gamma * len(y))))
+            good, bad = x[order[:n_good]], x[order[n_good:]]
+            bandwidth = (self.bounds[1] - self.bounds[0]) * len(x) ** (-1 / (x.shape[1] + 4))
+
+            samples = good[self.rng.integers(0, len(good), n_samples)]
+            samples = samples + self.rng.normal(0, bandwidth, samples.shape)
+            samples = np.clip(samples, *self.bounds)
+
+            ratio = _log_density(good, samples, bandwidth)
+            if len(bad):
+                ratio -= _log_density(bad, samples, bandwidth)
+            n = min(batch_size, n_trials)
+            self.score_many(np.exp(samples[np.argsort(-ratio)[:n]]))
+            n_trials -= n
+
+        return self.results()
+
+    def results(self):
+        """All trials as boost_dicts with their score, best first."""
+        rows = [
+            {**dict(zip(self.cache.fields, map(float, weights))), self.metric: score}
+            for weights, score in self.trials
+        ]
+        return sorted(rows, key=lambda row: row[self.metric], reverse=True)
+
+    def best_boosts(self):
+        best = self.results()[0]
+        return {field: best[field] for field in self.cache.fields}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,15 +1,43 @@
+import json
+import os
+import threading
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from tqdm.auto import tqdm
 from rag_helper import RAGBase
 
+try:
+    from retry_policy import DEFAULT_POLICY, RetryPolicy, without_client_retries
+except ImportError:
+    # downloaded next to rag_helper.py only, as in the lessons
+    from rag_helper import DEFAULT_POLICY, without_client_retries
+    RetryPolicy = None
 
-def calc_price(usage):
+
+def usage_tokens(usage):
+    # usage objects from the API, or plain dicts when read back from a checkpoint
+    if isinstance(usage, dict):
+        return usage["input_tokens"], usage["output_tokens"]
+    return usage.input_tokens, usage.output_tokens
+
+
+# the Batch API charges half the synchronous price
+BATCH_DISCOUNT = 0.5
+
+
+def calc_price(usage, batch=False):
     input_price_per_million = 0.75
     output_price_per_million = 4.50
 
-    input_cost = (usage.input_tokens / 1_000_000) * input_price_per_million
-    output_cost = (usage.output_tokens / 1_000_000) * output_price_per_million
+    if batch:
+        input_price_per_million *= BATCH_DISCOUNT
+        output_price_per_million *= BATCH_DISCOUNT
+
+    input_tokens, output_tokens = usage_tokens(usage)
+    input_cost = (input_tokens / 1_000_000) * input_price_per_million
+    output_cost = (output_tokens / 1_000_000) * output_price_per_million
     total_cost = input_cost + output_cost
 
     return {
@@ -19,23 +47,25 @@ def calc_price(usage):
     }
 
 
-def calc_total_price(usages):
+def calc_total_price(usages, batch=False):
     total_cost = 0.0
 
     for usage in usages:
-        cost = calc_price(usage)
+        cost = calc_price(usage, batch=batch)
         total_cost = total_cost + cost["total_cost"]
 
     return total_cost
 
 
-def llm_structured(client, instructions, user_prompt, output_type, model="gpt-5.4-mini"):
+def llm_structured(client, instructions, user_prompt, output_type, model="gpt-5.4-mini", retry_policy=None):
     messages = [
         {"role": "developer", "content": instructions},
         {"role": "user", "content": user_prompt}
     ]
 
-    response = client.responses.parse(
+    retry_policy = retry_policy or DEFAULT_POLICY
+    response = retry_policy.call(
+        without_client_retries(client).responses.parse,
         model=model,
         input=messages,
         text_format=output_type
@@ -52,19 +82,29 @@ def llm_structured_retry(
     model="gpt-5.4-mini",
     max_retries=3,
 ):
-    for attempt in range(max_retries):
-        try:
-            return llm_structured(
-                client,
-                instructions,
-                user_prompt,
-                output_type,
-                model=model,
-            )
-        except Exception:
-            if attempt == max_retries - 1:
-                raise
-            time.sleep(2 ** attempt)
+    if RetryPolicy is None:
+        for attempt in range(max_retries):
+            try:
+                return llm_structured(
+                    client,
+                    instructions,
+                    user_prompt,
+                    output_type,
+                    model=model,
+                )
+            except Exception:
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    return llm_structured(
+        client,
+        instructions,
+        user_prompt,
+        output_type,
+        model=model,
+        retry_policy=RetryPolicy(max_retries=max_retries - 1),
+    )
 
 
 class RAGWithUsage(RAGBase):
@@ -95,7 +135,8 @@ class RAGWithUsage(RAGBase):
             {"role": "user", "content": prompt}
         ]
 
-        response = self.llm_client.responses.create(
+        response = self.retry_policy.call(
+            self.llm_client.responses.create,
             model=self.model,
             input=input_messages
         )
@@ -125,3 +166,197 @@ def map_progress(pool, seq, f):
             results.append(result)
 
     return results
+
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at `per_minute` tokens per minute.
+
+    The capacity defaults to one second's worth of tokens (at least one), so
+    a burst at the start cannot spend the whole minute's budget at once.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(self.rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # a request bigger than the bucket would wait forever, so cap it
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        """Takes amount more tokens (or gives them back if negative) without waiting.
+
+        The bucket can go negative, later acquire() calls then wait the debt off.
+        """
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def estimate_tokens(item, output_tokens=500):
+    """Rough token count of a call made for item: about 4 characters per token plus the expected output.
+
+    This only sees the input record, not the instructions or retrieved
+    context of the prompt, run_evaluation corrects it with the actual usage.
+    """
+    return len(json.dumps(item, default=str)) // 4 + output_tokens
+
+
+def estimate_rag_tokens(rag, output_tokens=500, question_field="question"):
+    """estimate for run_evaluation over ground-truth records answered with rag.rag().
+
+    Builds the real prompt (instructions plus the retrieved documents), the
+    local search is cheap next to the LLM call.
+    """
+    def estimate(rec):
+        question = rec[question_field]
+        prompt = rag.build_prompt(question, rag.search(question))
+        return (len(rag.instructions) + len(prompt)) // 4 + output_tokens
+    return estimate
+
+
+def find_usage(result):
+    """The usage of a result shaped like (output, usage), None for other results."""
+    if isinstance(result, (tuple, list)) and result:
+        usage = result[-1]
+        if hasattr(usage, "input_tokens") or (isinstance(usage, dict) and "input_tokens" in usage):
+            return usage
+    return None
+
+
+def to_json(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    return value
+
+
+def read_checkpoint(checkpoint_path):
+    done = {}
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, "rt") as f_in:
+        for line in f_in:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line can be cut short if the previous run was killed
+                continue
+            if entry.get("error") is None:
+                done[entry["key"]] = entry["result"]
+    return done
+
+
+def run_evaluation(
+    seq,
+    f,
+    checkpoint_path=None,
+    max_workers=6,
+    rpm=None,
+    tpm=None,
+    estimate=estimate_tokens,
+    key=None,
+    usage=find_usage,
+):
+    """Applies f to every element of seq in a thread pool within RPM/TPM limits.
+
+    Before each call the worker takes one request from the RPM bucket and
+    estimate(el) tokens from the TPM bucket, or the average actual usage so
+    far if that is higher. When usage(result) finds the API usage of a call
+    (f returning (output, usage) by default), the bucket is corrected by the
+    difference, so the TPM limit holds even when estimates are off. Every result is appended to the
+    JSONL checkpoint as soon as it finishes, together with key(el) (the
+    position in seq by default). Running again with the same checkpoint only
+    processes the elements that have no successful result yet. Results are
+    returned the way they are stored in the checkpoint, as plain JSON: tuples
+    become lists and pydantic objects (such as usage) become dicts.
+
+    A failing element does not stop the run, it is recorded in the
+    checkpoint and returned in failures.
+
+    Returns:
+        tuple: (results, failures), results of the successful elements in
+        input order, and a list of {"key", "item", "error"} dicts.
+    """
+    keys = [key(el) if key else i for i, el in enumerate(seq)]
+    done = read_checkpoint(checkpoint_path)
+    pending = [(k, el) for k, el in zip(keys, seq) if k not in done]
+
+    request_bucket = TokenBucket(rpm) if rpm else None
+    token_bucket = TokenBucket(tpm) if tpm else None
+    # actual usage of the calls so far, the floor for later estimates
+    used = {"calls": 0, "tokens": 0}
+    used_lock = threading.Lock()
+
+    def process(el):
+        if request_bucket is not None:
+            request_bucket.acquire(1)
+        if token_bucket is None:
+            return f(el)
+
+        reserved = estimate(el)
+        with used_lock:
+            if used["calls"]:
+                reserved = max(reserved, used["tokens"] // used["calls"])
+        token_bucket.acquire(reserved)
+
+        result = f(el)
+        result_usage = usage(result) if usage is not None else None
+        if result_usage is not None:
+            actual = sum(usage_tokens(result_usage))
+            token_bucket.adjust(actual - reserved)
+            with used_lock:
+                used["calls"] += 1
+                used["tokens"] += actual
+        return result
+
+    failures = []
+    checkpoint = open(checkpoint_path, "at") if checkpoint_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+                tqdm(total=len(seq), initial=len(seq) - len(pending)) as progress:
+            futures = {pool.submit(process, el): (k, el) for k, el in pending}
+
+            for future in as_completed(futures):
+                k, el = futures[future]
+                try:
+                    result = to_json(future.result())
+                    # a result that cannot be stored counts as a failure of its element
+                    line = json.dumps({"key": k, "result": result, "error": None})
+                    done[k] = result
+                except Exception as e:
+                    line = json.dumps({"key": k, "result": None, "error": repr(e),
+                                       "traceback": traceback.format_exc()})
+                    failures.append({"key": k, "item": el, "error": e})
+
+                if checkpoint is not None:
+                    checkpoint.write(line + "\n")
+                    checkpoint.flush()
+                progress.update()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if failures:
+        print(f"{len(failures)} of {len(seq)} items failed, run again to retry them")
+
+    results = [done[k] for k in keys if k in done]
+    return results, failures
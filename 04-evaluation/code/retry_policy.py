@@ -0,0 +1,241 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import openai
+
+
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+
+def classify_error(error):
+    """Sorts an exception from an LLM call into rate_limit, transient or fatal.
+
+    Only rate limits, timeouts, connection errors and server errors are
+    worth retrying. Bad requests, authentication, exhausted quota and
+    output validation errors fail the same way on every attempt.
+    """
+    if isinstance(error, openai.RateLimitError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return FATAL
+        return RATE_LIMIT
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return TRANSIENT
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code in (408, 409) or error.status_code >= 500:
+            return TRANSIENT
+        return FATAL
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+    return FATAL
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, from retry-after-ms or Retry-After."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def without_client_retries(client):
+    # the OpenAI client retries twice on its own, which would multiply our delays
+    if hasattr(client, "with_options"):
+        return client.with_options(max_retries=0)
+    return client
+
+
+class CircuitBreaker:
+    """Pause shared by every thread that uses the same policy.
+
+    A rate limit opens the breaker for the requested delay, and
+    failure_threshold consecutive transient errors open it for cooldown
+    seconds. While it is open, new calls wait instead of hitting the API,
+    so a throttled pool backs off as a unit.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        return max(0.0, self.open_until - time.monotonic())
+
+    def wait(self):
+        while (delay := self.remaining()) > 0:
+            time.sleep(delay)
+
+    async def await_closed(self):
+        while (delay := self.remaining()) > 0:
+            await asyncio.sleep(delay)
+
+    def trip(self, delay):
+        with self.lock:
+            until = time.monotonic() + delay
+            if until > self.open_until:
+                if self.remaining() == 0:
+                    self.opened += 1
+                self.open_until = until
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            failures = self.consecutive_failures
+        if failures >= self.failure_threshold:
+            self.trip(self.cooldown)
+
+
+class RetryMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.retries = {RATE_LIMIT: 0, TRANSIENT: 0}
+        self.failures = {RATE_LIMIT: 0, TRANSIENT: 0, FATAL: 0}
+
+    def record_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def record_retry(self, kind):
+        with self.lock:
+            self.retries[kind] += 1
+
+    def record_failure(self, kind):
+        with self.lock:
+            self.failures[kind] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "retries": dict(self.retries),
+                "failures": dict(self.failures),
+            }
+
+
+BREAKER = CircuitBreaker()
+METRICS = RetryMetrics()
+
+
+@dataclass
+class RetryPolicy:
+    """Retries rate limits and transient errors with decorrelated jitter.
+
+    Each delay is drawn uniformly from [base_delay, 3 * previous delay] and
+    capped at max_delay, so threads that fail together do not retry
+    together. A Retry-After from the server is used as the minimum delay.
+    By default all policies share one circuit breaker and one set of
+    metrics.
+    """
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 60.0
+    breaker: CircuitBreaker = field(default_factory=lambda: BREAKER)
+    metrics: RetryMetrics = field(default_factory=lambda: METRICS)
+
+    def __post_init__(self):
+        self._local = threading.local()
+
+    @property
+    def last_retries(self):
+        """Number of retries of the last call made from this thread."""
+        return getattr(self._local, "retries", 0)
+
+    def _next_delay(self, error, kind, delay):
+        delay = min(self.max_delay, random.uniform(self.base_delay, delay * 3))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+
+        if kind == RATE_LIMIT:
+            self.breaker.trip(delay)
+        else:
+            self.breaker.record_failure()
+        self.metrics.record_retry(kind)
+        return delay
+
+    def _give_up(self, error, attempt):
+        kind = classify_error(error)
+        if kind == FATAL or attempt >= self.max_retries:
+            self.metrics.record_failure(kind)
+            return kind, True
+        return kind, False
+
+    def call(self, f, *args, **kwargs):
+        self.metrics.record_call()
+        self._local.retries = 0
+        delay = self.base_delay
+
+        attempt = 0
+        while True:
+            self.breaker.wait()
+            try:
+                result = f(*args, **kwargs)
+            except Exception as e:
+                kind, give_up = self._give_up(e, attempt)
+                if give_up:
+                    raise
+                delay = self._next_delay(e, kind, delay)
+                attempt += 1
+                self._local.retries = attempt
+                print(f"LLM call failed ({kind}: {e}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, f, *args, **kwargs):
+        self.metrics.record_call()
+        delay = self.base_delay
+
+        attempt = 0
+        while True:
+            await self.breaker.await_closed()
+            try:
+                result = await f(*args, **kwargs)
+            except Exception as e:
+                kind, give_up = self._give_up(e, attempt)
+                if give_up:
+                    raise
+                delay = self._next_delay(e, kind, delay)
+                attempt += 1
+                print(f"LLM call failed ({kind}: {e}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+DEFAULT_POLICY = RetryPolicy()
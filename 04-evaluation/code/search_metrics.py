@@ -0,0 +1,172 @@
+import numpy as np
+
+
+class RelevanceMatrix(np.ndarray):
+    """Boolean relevance matrix that remembers how many documents are relevant per query.
+
+    relevance_matrix returns one when the relevant ids are sets, and recall
+    and nDCG then divide by the set sizes unless n_relevant is passed.
+    Indexing keeps the counts of the selected queries, e.g. relevance[:, :k]
+    or relevance[mask]; other operations that change the number of queries
+    drop them.
+    """
+
+    def __new__(cls, relevance, n_relevant):
+        matrix = np.asarray(relevance).view(cls)
+        matrix.n_relevant = np.asarray(n_relevant, dtype=np.float64)
+        return matrix
+
+    def __getitem__(self, index):
+        result = super().__getitem__(index)
+        if isinstance(result, RelevanceMatrix) and result.ndim == 2 and self.n_relevant is not None:
+            rows = index[0] if isinstance(index, tuple) else index
+            result.n_relevant = self.n_relevant[rows]
+        return result
+
+    def __array_finalize__(self, obj):
+        n_relevant = getattr(obj, "n_relevant", None)
+        if n_relevant is not None and (self.ndim != 2 or self.shape[0] != len(n_relevant)):
+            n_relevant = None
+        self.n_relevant = n_relevant
+
+
+def relevance_matrix(ranked_ids, relevant_ids, k=None):
+    """Builds the boolean relevance matrix of shape (queries, k).
+
+    ranked_ids holds the ids returned for every query, best first, as a 2-D
+    array or a list of lists (shorter lists are padded as not relevant).
+    relevant_ids holds one relevant id per query, or a set of ids per query;
+    with sets the result is a RelevanceMatrix carrying the set sizes.
+    """
+    multiple = len(relevant_ids) > 0 and isinstance(relevant_ids[0], (set, frozenset, list, tuple))
+    if isinstance(ranked_ids, np.ndarray) and ranked_ids.ndim == 2 and not multiple:
+        # fast path for arrays of ids, e.g. document positions from top_k
+        return ranked_ids[:, :k] == np.asarray(relevant_ids)[:, None]
+
+    if k is None:
+        k = max((len(ids) for ids in ranked_ids), default=0)
+
+    n = len(ranked_ids)
+    ranked = np.full((n, k), None, dtype=object)
+    for i, ids in enumerate(ranked_ids):
+        ids = list(ids)[:k]
+        ranked[i, :len(ids)] = ids
+
+    if multiple:
+        relevance = np.zeros((n, k), dtype=bool)
+        for i, relevant in enumerate(relevant_ids):
+            relevance[i] = [doc_id in relevant for doc_id in ranked[i]]
+        return RelevanceMatrix(relevance, [len(set(relevant)) for relevant in relevant_ids])
+
+    relevant = np.empty(n, dtype=object)
+    relevant[:] = list(relevant_ids)
+    return ranked == relevant[:, None]
+
+
+def search_relevance(ground_truth, search_function, k=5, id_field="id", question_field="question",
+                     document_field="document"):
+    """Runs search_function once per ground-truth record and returns the relevance matrix."""
+    ranked_ids = [
+        [doc[id_field] for doc in search_function(query=q[question_field])]
+        for q in ground_truth
+    ]
+    relevant_ids = [q[document_field] for q in ground_truth]
+    return relevance_matrix(ranked_ids, relevant_ids, k=k)
+
+
+def _n_relevant(relevance, n_relevant):
+    if n_relevant is None:
+        n_relevant = getattr(relevance, "n_relevant", None)
+    if n_relevant is None:
+        return np.ones(len(relevance))
+    return np.broadcast_to(np.asarray(n_relevant, dtype=np.float64), (len(relevance),))
+
+
+def hits(relevance):
+    return relevance.any(axis=1).astype(np.float64)
+
+
+def reciprocal_ranks(relevance):
+    first = relevance.argmax(axis=1)
+    return np.where(relevance.any(axis=1), 1.0 / (first + 1), 0.0)
+
+
+def precisions(relevance):
+    return relevance.sum(axis=1) / relevance.shape[1]
+
+
+def recalls(relevance, n_relevant=None):
+    return relevance.sum(axis=1) / _n_relevant(relevance, n_relevant)
+
+
+def ndcgs(relevance, n_relevant=None):
+    discounts = 1.0 / np.log2(np.arange(2, relevance.shape[1] + 2))
+    dcg = relevance @ discounts
+
+    n_ideal = np.minimum(_n_relevant(relevance, n_relevant), relevance.shape[1]).astype(int)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[n_ideal]
+    return np.divide(dcg, ideal, out=np.zeros_like(dcg), where=ideal > 0)
+
+
+PER_QUERY_METRICS = {
+    "hit_rate": hits,
+    "mrr": reciprocal_ranks,
+    "precision": precisions,
+    "recall": recalls,
+    "ndcg": ndcgs,
+}
+
+
+def hit_rate(relevance):
+    return hits(relevance).mean()
+
+
+def mrr(relevance):
+    return reciprocal_ranks(relevance).mean()
+
+
+def precision_at_k(relevance, k=None):
+    return precisions(relevance[:, :k]).mean()
+
+
+def recall_at_k(relevance, k=None, n_relevant=None):
+    return recalls(relevance[:, :k], n_relevant).mean()
+
+
+def ndcg(relevance, k=None, n_relevant=None):
+    return ndcgs(relevance[:, :k], n_relevant).mean()
+
+
+def per_query_scores(relevance, metric, n_relevant=None):
+    if metric in ("recall", "ndcg"):
+        return PER_QUERY_METRICS[metric](relevance, n_relevant)
+    return PER_QUERY_METRICS[metric](relevance)
+
+
+def bootstrap_ci(relevance, metric="mrr", n_resamples=1000, confidence=0.95, n_relevant=None, seed=1):
+    """Percentile bootstrap confidence interval of a metric over queries.
+
+    All resamples are drawn as one (n_resamples, queries) index matrix.
+
+    Returns:
+        tuple: (low, high).
+    """
+    scores = per_query_scores(relevance, metric, n_relevant)
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, len(scores), size=(n_resamples, len(scores)))
+    means = scores[samples].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def evaluate(relevance, n_relevant=None, ci=False, n_resamples=1000):
+    """All metrics at k = relevance.shape[1], optionally with 95% bootstrap intervals."""
+    result = {
+        name: float(per_query_scores(relevance, name, n_relevant).mean())
+        for name in PER_QUERY_METRICS
+    }
+    if ci:
+        for name in PER_QUERY_METRICS:
+            result[f"{name}_ci"] = bootstrap_ci(relevance, name, n_resamples=n_resamples, n_relevant=n_relevant)
+    return result
@@ -0,0 +1,250 @@
+import json
+import threading
+from email import message_from_bytes
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import OpenAI
+from pydantic import BaseModel
+
+import batch_llm
+from batch_llm import MANIFEST_FILE, run_batch, text_format
+
+
+class Questions(BaseModel):
+    questions: list[str]
+
+
+USAGE = {"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}
+
+
+def answer(body):
+    """The fake model: one question per word of the user prompt, "fail" fails the request."""
+    prompt = body["input"][-1]["content"]
+    if prompt == "fail":
+        return None
+    if prompt == "garbage":
+        return "not json"
+    return json.dumps({"questions": [f"{word}?" for word in prompt.split()]})
+
+
+class FakeBatchAPI:
+    """Local stand-in for the Files and Batches endpoints of the OpenAI API.
+
+    A batch is processed when it is created and reported as in_progress on
+    the first retrieve, so clients have to poll once. It then ends with the
+    status set in api.status.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.batches = {}
+        self.retrieves = {}
+        self.created_batches = 0
+        self.status = "completed"
+        self.lock = threading.Lock()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _send_json(self, data, status=200):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self._read_body()
+                if self.path == "/v1/files":
+                    self._send_json(api.upload(self.headers["Content-Type"], body))
+                elif self.path == "/v1/batches":
+                    self._send_json(api.create_batch(json.loads(body)))
+                else:
+                    self._send_json({"error": {"message": "not found"}}, status=404)
+
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if parts[:2] == ["v1", "batches"] and len(parts) == 3:
+                    self._send_json(api.retrieve_batch(parts[2]))
+                elif parts[:2] == ["v1", "files"] and parts[-1] == "content":
+                    content = api.files[parts[2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self._send_json({"error": {"message": "not found"}}, status=404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def _store_file(self, content):
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = content
+        return file_id
+
+    def upload(self, content_type, body):
+        message = message_from_bytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body, policy=HTTP)
+        content = next(
+            part.get_payload(decode=True) for part in message.iter_parts()
+            if part.get_param("name", header="content-disposition") == "file"
+        )
+        with self.lock:
+            file_id = self._store_file(content)
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, params):
+        output, errors = [], []
+        for line in self.files[params["input_file_id"]].decode("utf-8").splitlines():
+            request = json.loads(line)
+            text = answer(request["body"])
+            if text is None:
+                errors.append({"custom_id": request["custom_id"], "response": None,
+                               "error": {"code": "server_error", "message": "failed"}})
+                continue
+            body = {"output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+                    "usage": USAGE}
+            output.append({"custom_id": request["custom_id"], "error": None,
+                           "response": {"status_code": 200, "body": body}})
+
+        with self.lock:
+            self.created_batches += 1
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": params["endpoint"],
+                "completion_window": params["completion_window"],
+                "input_file_id": params["input_file_id"],
+                "created_at": 0,
+                "status": self.status,
+                "output_file_id": self._store_file("".join(json.dumps(o) + "\n" for o in output).encode()),
+                "error_file_id": self._store_file("".join(json.dumps(e) + "\n" for e in errors).encode()),
+                "request_counts": {"total": len(output) + len(errors), "completed": len(output),
+                                   "failed": len(errors)},
+            }
+            self.retrieves[batch_id] = 0
+        return {**self.batches[batch_id], "status": "validating"}
+
+    def retrieve_batch(self, batch_id):
+        with self.lock:
+            self.retrieves[batch_id] += 1
+            if self.retrieves[batch_id] == 1:
+                return {**self.batches[batch_id], "status": "in_progress"}
+        return self.batches[batch_id]
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def api():
+    api = FakeBatchAPI()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def client(api):
+    return OpenAI(api_key="test", base_url=api.url, max_retries=0)
+
+
+def run(client, records, batch_dir):
+    return run_batch(
+        client,
+        records,
+        instructions="Generate questions",
+        build_prompt=lambda record: record["text"],
+        output_type=Questions,
+        batch_dir=batch_dir,
+        custom_id=lambda record: record["id"],
+        poll_interval=0,
+    )
+
+
+RECORDS = [
+    {"id": "a", "text": "one two"},
+    {"id": "b", "text": "fail"},
+    {"id": "c", "text": "three"},
+    {"id": "d", "text": "garbage"},
+]
+
+
+def test_text_format_is_strict():
+    schema = text_format(Questions)["schema"]
+
+    assert text_format(Questions)["strict"] is True
+    assert schema["additionalProperties"] is False
+    assert schema["required"] == ["questions"]
+
+
+def test_results_are_joined_back_in_record_order(client, tmp_path):
+    results, failures = run(client, RECORDS, tmp_path)
+
+    assert [(record["id"], parsed.questions) for record, parsed, _ in results] == [
+        ("a", ["one?", "two?"]),
+        ("c", ["three?"]),
+    ]
+    assert all(usage == USAGE for _, _, usage in results)
+    assert [failure["record"]["id"] for failure in failures] == ["b", "d"]
+    assert "Could not parse" in failures[1]["error"]
+
+
+def test_requests_are_split_into_several_batches(client, api, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_llm, "MAX_REQUESTS_PER_BATCH", 2)
+    records = [{"id": str(i), "text": f"word{i}"} for i in range(5)]
+
+    results, failures = run(client, records, tmp_path)
+
+    assert api.created_batches == 3
+    assert sorted(tmp_path.glob("batch_*.jsonl")) == [tmp_path / f"batch_00{i}.jsonl" for i in range(3)]
+    assert [parsed.questions for _, parsed, _ in results] == [[f"word{i}?"] for i in range(5)]
+    assert failures == []
+
+
+def test_rerun_reattaches_to_submitted_batches(client, api, tmp_path):
+    first, _ = run(client, RECORDS, tmp_path)
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text())
+
+    second, _ = run(client, RECORDS, tmp_path)
+
+    assert api.created_batches == 1
+    assert manifest["batch_000.jsonl"]["batch_id"] == "batch-0"
+    assert [parsed for _, parsed, _ in second] == [parsed for _, parsed, _ in first]
+
+
+def test_changed_requests_are_submitted_again(client, api, tmp_path):
+    run(client, RECORDS, tmp_path)
+
+    results, _ = run(client, [{"id": "a", "text": "four"}], tmp_path)
+
+    assert api.created_batches == 2
+    assert results[0][1].questions == ["four?"]
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_batches_that_did_not_complete_are_submitted_again(client, api, tmp_path, status):
+    api.status = status
+    run(client, RECORDS, tmp_path)
+    api.status = "completed"
+
+    results, _ = run(client, RECORDS, tmp_path)
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text())
+
+    assert api.created_batches == 2
+    assert manifest["batch_000.jsonl"]["batch_id"] == "batch-1"
+    assert [record["id"] for record, _, _ in results] == ["a", "c"]
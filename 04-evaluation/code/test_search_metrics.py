@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from search_metrics import RelevanceMatrix, evaluate, ndcg, recall_at_k, relevance_matrix, search_relevance
+
+
+RANKED = [["a", "b", "c"], ["x", "y", "z"], ["d", "e", "f"]]
+RELEVANT = [{"a", "b", "q"}, {"y"}, {"d", "e", "f"}]
+
+
+def test_single_ids_count_one_relevant_document():
+    relevance = relevance_matrix(RANKED, ["b", "q", "d"])
+
+    assert not isinstance(relevance, RelevanceMatrix)
+    assert evaluate(relevance)["recall"] == pytest.approx(2 / 3)
+
+
+def test_sets_use_their_size_as_n_relevant():
+    relevance = relevance_matrix(RANKED, RELEVANT)
+
+    assert list(relevance.n_relevant) == [3, 1, 3]
+    assert list(relevance[:, :2].n_relevant) == [3, 1, 3]
+    assert evaluate(relevance)["recall"] == pytest.approx((2 / 3 + 1 + 1) / 3)
+    assert recall_at_k(relevance, k=1) == pytest.approx((1 / 3 + 0 + 1 / 3) / 3)
+
+
+def test_recall_and_ndcg_stay_within_one_for_sets():
+    relevance = relevance_matrix(RANKED, RELEVANT)
+    metrics = evaluate(relevance, ci=True, n_resamples=100)
+
+    for name in ["recall", "ndcg"]:
+        assert 0 <= metrics[name] <= 1
+        assert metrics[f"{name}_ci"][1] <= 1
+    for k in range(1, 4):
+        assert recall_at_k(relevance, k=k) <= 1
+        assert ndcg(relevance, k=k) <= 1
+    assert ndcg(relevance[2:]) == pytest.approx(1.0)
+
+
+def test_explicit_n_relevant_wins():
+    relevance = relevance_matrix(RANKED, RELEVANT)
+
+    assert evaluate(relevance, n_relevant=np.array([4, 1, 6]))["recall"] == pytest.approx((2 / 4 + 1 + 3 / 6) / 3)
+
+
+def test_search_relevance_with_sets_of_documents():
+    documents = {"a": "q1", "b": "q1", "c": "q2"}
+    ground_truth = [{"question": "q1", "document": {"a", "b"}}, {"question": "q2", "document": {"c", "d"}}]
+
+    def search_function(query):
+        return [{"id": doc_id} for doc_id, question in documents.items() if question == query]
+
+    metrics = evaluate(search_relevance(ground_truth, search_function, k=3))
+
+    assert metrics["recall"] == pytest.approx((1 + 0.5) / 2)
+    assert metrics["ndcg"] <= 1
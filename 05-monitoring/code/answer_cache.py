@@ -0,0 +1,205 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
+
+from incremental_sync import content_hash
+from retry_policy import CircuitBreaker, RetryPolicy, without_client_retries
+
+
+def normalize_question(question):
+    question = unicodedata.normalize("NFKC", question).lower()
+    question = re.sub(r"[^\w\s]", " ", question)
+    return " ".join(question.split())
+
+
+def prompt_version(instructions, prompt_template):
+    text = instructions + "\x1f" + prompt_template
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def corpus_fingerprint(documents):
+    """Hash of the FAQ documents behind the index, changes when any entry changes."""
+    digest = hashlib.sha256()
+    for doc_hash in sorted(content_hash(doc) for doc in documents):
+        digest.update(doc_hash.encode("ascii"))
+    return digest.hexdigest()
+
+
+def openai_embedder(client, model="text-embedding-3-small", retry_policy=None):
+    # a lookup should not hold up the answer for long, and an embeddings
+    # outage should not open the breaker the LLM calls wait on
+    if retry_policy is None:
+        retry_policy = RetryPolicy(max_retries=1, max_delay=1.0, breaker=CircuitBreaker())
+    client = without_client_retries(client)
+
+    def embed(text):
+        response = retry_policy.call(client.embeddings.create, model=model, input=text)
+        return response.data[0].embedding
+    return embed
+
+
+@dataclass
+class CacheStats:
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    embed_errors: int = 0
+
+    @property
+    def lookups(self):
+        return self.exact_hits + self.semantic_hits + self.misses
+
+    @property
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return (self.exact_hits + self.semantic_hits) / self.lookups
+
+
+class AnswerCache:
+    """Two-tier cache of generated answers, stored in SQLite.
+
+    The exact tier matches the normalized question within a scope of
+    course, model and prompt version. The semantic tier embeds the question
+    with `embed` (any text -> vector function, disabled when None) and
+    returns the closest cached answer in the same scope if its cosine
+    similarity is at least `threshold`; the vectors of the scope are kept in
+    memory as one normalized matrix. If embedding fails, the lookup counts
+    as a miss and the answer is stored for the exact tier only, so the
+    cache never fails a request.
+
+    Entries expire after `ttl` seconds. Every entry stores the fingerprint
+    of the FAQ documents it was generated from, and entries with another
+    fingerprint are dropped, so answers never outlive the documents.
+    """
+
+    def __init__(self, path="answer_cache.db", fingerprint="", embed=None, threshold=0.92, ttl=7 * 24 * 3600):
+        self.fingerprint = fingerprint
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._vectors = {}
+        self._last_embedding = None
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                vector BLOB,
+                fingerprint TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (scope, question)
+            )
+        """)
+        self._conn.commit()
+        self.invalidate()
+
+    def invalidate(self, fingerprint=None):
+        """Drops expired entries and entries built from other documents."""
+        if fingerprint is not None:
+            self.fingerprint = fingerprint
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM answers WHERE fingerprint != ? OR created < ?",
+                (self.fingerprint, time.time() - self.ttl),
+            )
+            self._conn.commit()
+            self._vectors = {}
+
+    def _scope(self, course, model, version):
+        return f"{course}\x1f{model}\x1f{version}"
+
+    def _scope_vectors(self, scope):
+        # (questions, matrix of normalized vectors), loaded on first use
+        if scope not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT question, vector FROM answers WHERE scope = ? AND vector IS NOT NULL",
+                (scope,),
+            ).fetchall()
+            questions = [question for question, _ in rows]
+            matrix = np.array([np.frombuffer(blob, dtype=np.float32) for _, blob in rows], dtype=np.float32)
+            self._vectors[scope] = (questions, matrix)
+        return self._vectors[scope]
+
+    def _get(self, scope, question):
+        row = self._conn.execute(
+            "SELECT answer, created FROM answers WHERE scope = ? AND question = ?",
+            (scope, question),
+        ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        return row[0]
+
+    def _embed(self, question):
+        """Normalized embedding of the question, or None if the embedding call failed."""
+        # a miss is usually followed by store() of the same question
+        last = self._last_embedding
+        if last is not None and last[0] == question:
+            return last[1]
+        try:
+            vector = np.asarray(self.embed(question), dtype=np.float32)
+        except Exception as e:
+            self.stats.embed_errors += 1
+            print(f"Answer cache: could not embed the question ({e}), skipping the semantic tier")
+            # store() of the same question does not retry the failed call
+            self._last_embedding = (question, None)
+            return None
+        vector = vector / (np.linalg.norm(vector) or 1)
+        self._last_embedding = (question, vector)
+        return vector
+
+    def lookup(self, question, course, model, version):
+        """Returns (answer, tier) with tier "exact" or "semantic", or (None, None)."""
+        scope = self._scope(course, model, version)
+        normalized = normalize_question(question)
+
+        with self._lock:
+            answer = self._get(scope, normalized)
+        if answer is not None:
+            self.stats.exact_hits += 1
+            return answer, "exact"
+
+        query = self._embed(normalized) if self.embed is not None else None
+        if query is not None:
+            with self._lock:
+                questions, matrix = self._scope_vectors(scope)
+                if len(questions):
+                    scores = matrix @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        answer = self._get(scope, questions[best])
+            if answer is not None:
+                self.stats.semantic_hits += 1
+                return answer, "semantic"
+
+        self.stats.misses += 1
+        return None, None
+
+    def store(self, question, course, model, version, answer):
+        scope = self._scope(course, model, version)
+        normalized = normalize_question(question)
+        vector = self._embed(normalized) if self.embed is not None else None
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, normalized, answer, None if vector is None else vector.tobytes(),
+                 self.fingerprint, time.time()),
+            )
+            self._conn.commit()
+            # the next semantic lookup in this scope reloads its vectors
+            self._vectors.pop(scope, None)
+
+    def close(self):
+        self._conn.close()
@@ -13,12 +13,16 @@ st.title("Course Assistant")
 user_input = st.text_input("Enter your question:")
 
 if st.button("Ask"):
-    with st.spinner("Processing..."):
-        answer = assistant.rag(user_input)
-        st.success("Completed!")
-        st.write(answer)
+    answer = st.write_stream(assistant.rag_stream(user_input))
 
+    with st.spinner("Processing..."):
         record = assistant.last_call
+        if record is None:
+            st.error("The answer was not recorded, so it is not saved.")
+            st.stop()
+
+        if record.time_to_first_token is not None:
+            st.write(f"Time to first token: {record.time_to_first_token:.2f}s")
         st.write(f"Response time: {record.response_time:.2f}s")
         st.write(f"Prompt tokens: {record.prompt_tokens}")
         st.write(f"Completion tokens: {record.completion_tokens}")
@@ -1,9 +1,11 @@
+import os
 import sys
 
 from dotenv import load_dotenv
 from openai import OpenAI
 
-from ingest import load_faq_data, build_index
+from answer_cache import AnswerCache, openai_embedder
+from ingest import load_faq_data, build_index, save_index, load_index, index_fingerprint
 from metrics import RAGWithMetrics
 from db_save import save_conversation
 
@@ -11,12 +13,33 @@ from db_save import save_conversation
 def create_assistant():
     load_dotenv()
 
-    documents = load_faq_data()
-    index = build_index(documents)
+    index_path = os.getenv("INDEX_PATH", "faq_index")
+    if os.path.exists(index_path):
+        index = load_index(index_path)
+    else:
+        documents = load_faq_data()
+        index = build_index(documents)
+        save_index(index, index_path)
+
+    llm_client = OpenAI()
+
+    answer_cache = None
+    if os.getenv("ANSWER_CACHE", "1") == "1":
+        embed = None
+        if os.getenv("ANSWER_CACHE_SEMANTIC", "1") == "1":
+            embed = openai_embedder(llm_client)
+        answer_cache = AnswerCache(
+            path=os.getenv("ANSWER_CACHE_PATH", "answer_cache.db"),
+            fingerprint=index_fingerprint(index),
+            embed=embed,
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))),
+        )
 
     return RAGWithMetrics(
         index=index,
-        llm_client=OpenAI()
+        llm_client=llm_client,
+        answer_cache=answer_cache
     )
 
 if __name__ == "__main__":
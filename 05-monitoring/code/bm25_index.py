@@ -0,0 +1,350 @@
+import json
+import os
+import re
+import shutil
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase tokens of at least two word characters.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: List of tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, text_fields, keyword_fields=None, k1=1.2, b=0.75):
+        """
+        Initializes a BM25 index over the given text fields with exact-match keyword filters.
+
+        Args:
+            text_fields (list): List of text fields to be indexed.
+            keyword_fields (list, optional): List of keyword fields used for filtering.
+            k1 (float, optional): BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): BM25 length normalization. Defaults to 0.75.
+        """
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields or []
+        self.k1 = k1
+        self.b = b
+
+        self.docs = []
+        self.vocabularies = {}
+        self.matrices = {}
+        self.doc_lengths = {}
+        self.keyword_masks = {}
+        self.metadata = {}
+
+    def fit(self, documents):
+        """
+        Fits the index with the provided documents.
+
+        For every text field a term-document matrix is stored in CSR form, one row per
+        term, holding precomputed BM25 weights. For every keyword field a boolean mask
+        is stored per distinct value.
+
+        Args:
+            documents (list): List of documents to be indexed.
+        """
+        self.docs = documents
+
+        for field in self.text_fields:
+            vocabulary, matrix, doc_lengths = self._fit_field(field)
+            self.vocabularies[field] = vocabulary
+            self.matrices[field] = matrix
+            self.doc_lengths[field] = doc_lengths
+
+        for field in self.keyword_fields:
+            values = np.array([doc.get(field) for doc in documents], dtype=object)
+            self.keyword_masks[field] = {value: values == value for value in set(values)}
+
+        return self
+
+    def _fit_field(self, field):
+        vocabulary = {}
+        indptr = [0]
+        indices = []
+        counts = []
+
+        for doc in self.docs:
+            term_counts = Counter(tokenize(doc.get(field) or ""))
+            for term, count in term_counts.items():
+                indices.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        num_docs = len(self.docs)
+        indptr = np.array(indptr, dtype=np.int64)
+        indices = np.array(indices, dtype=np.int32)
+        counts = np.array(counts, dtype=np.float32)
+
+        row_lengths = np.diff(indptr)
+        doc_lengths = np.bincount(np.repeat(np.arange(num_docs), row_lengths), weights=counts, minlength=num_docs)
+        avg_length = doc_lengths.mean() if num_docs and doc_lengths.mean() > 0 else 1.0
+
+        doc_freq = np.bincount(indices, minlength=len(vocabulary))
+        idf = np.log1p((num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        length_norm = np.repeat(length_norm, row_lengths)
+        weights = idf[indices] * counts * (self.k1 + 1) / (counts + length_norm)
+
+        doc_term = sparse.csr_matrix(
+            (weights.astype(np.float32), indices, indptr),
+            shape=(num_docs, len(vocabulary))
+        )
+        return vocabulary, doc_term.T.tocsr(), doc_lengths.astype(np.float32)
+
+    def _query_vector(self, field, query):
+        vocabulary = self.vocabularies[field]
+        term_counts = Counter(t for t in tokenize(query) if t in vocabulary)
+        term_ids = np.array([vocabulary[t] for t in term_counts], dtype=np.int32)
+        values = np.array(list(term_counts.values()), dtype=np.float32)
+        return sparse.csr_matrix(
+            (values, term_ids, np.array([0, len(term_ids)])),
+            shape=(1, len(vocabulary))
+        )
+
+    def field_scores(self, query):
+        """
+        Computes the BM25 score of every document for each text field separately.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            dict: Mapping of text field to an array of scores, one per document.
+        """
+        scores = {}
+        for field in self.text_fields:
+            query_vector = self._query_vector(field, query)
+            scores[field] = (query_vector @ self.matrices[field]).toarray().ravel()
+        return scores
+
+    def filter_mask(self, filter_dict=None):
+        """
+        Builds a boolean mask of documents matching all keyword filters.
+
+        Args:
+            filter_dict (dict, optional): Keyword field to value, or to a list of accepted values.
+
+        Returns:
+            numpy.ndarray: Boolean array, one entry per document.
+        """
+        mask = np.ones(len(self.docs), dtype=bool)
+        for field, value in (filter_dict or {}).items():
+            masks = self.keyword_masks[field]
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            field_mask = np.zeros(len(self.docs), dtype=bool)
+            for v in values:
+                if v in masks:
+                    field_mask |= masks[v]
+            mask &= field_mask
+        return mask
+
+    def search(self, query, boost_dict=None, filter_dict=None, num_results=10, output_ids=False):
+        """
+        Searches the index for the given query with optional boosting and filtering.
+
+        Args:
+            query (str): The search query.
+            boost_dict (dict, optional): Dictionary of fields to boost in the search.
+            filter_dict (dict, optional): Dictionary of fields to filter results.
+            num_results (int, optional): Number of results to return. Defaults to 10.
+            output_ids (bool, optional): Add the document position as '_id'. Defaults to False.
+
+        Returns:
+            list: List of search results.
+        """
+        if not self.docs:
+            return []
+
+        boost_dict = boost_dict or {}
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for field in self.text_fields:
+            boost = boost_dict.get(field, 1.0)
+            if boost == 0:
+                continue
+            query_vector = self._query_vector(field, query)
+            if query_vector.nnz == 0:
+                continue
+            scores += boost * (query_vector @ self.matrices[field]).toarray().ravel()
+
+        if filter_dict:
+            scores[~self.filter_mask(filter_dict)] = 0
+
+        top = top_k(scores, num_results)
+        if output_ids:
+            return [{**self.docs[i], "_id": int(i)} for i in top]
+        return [self.docs[i] for i in top]
+
+
+    def save(self, path):
+        """
+        Writes the index to a snapshot directory.
+
+        Numeric arrays (postings, field norms, keyword codes, document offsets) are stored
+        as .npy files so that load() can memory-map them. Documents are stored as JSON lines
+        in a single file. The metadata dict (e.g. a corpus fingerprint) is stored in
+        meta.json. The snapshot is written next to the target and renamed into place.
+
+        Args:
+            path (str): Directory to write the snapshot to.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "text_fields": self.text_fields,
+            "keyword_fields": self.keyword_fields,
+            "k1": self.k1,
+            "b": self.b,
+            "num_docs": len(self.docs),
+            "vocabularies": {},
+            "keyword_values": {},
+            "metadata": self.metadata,
+        }
+
+        for i, field in enumerate(self.text_fields):
+            vocabulary = self.vocabularies[field]
+            meta["vocabularies"][field] = sorted(vocabulary, key=vocabulary.get)
+            matrix = self.matrices[field]
+            np.save(tmp_path / f"text_{i}_indptr.npy", matrix.indptr)
+            np.save(tmp_path / f"text_{i}_indices.npy", matrix.indices)
+            np.save(tmp_path / f"text_{i}_data.npy", matrix.data)
+            np.save(tmp_path / f"text_{i}_lengths.npy", self.doc_lengths[field])
+
+        for i, field in enumerate(self.keyword_fields):
+            values = list(self.keyword_masks[field])
+            codes = np.full(len(self.docs), -1, dtype=np.int32)
+            for code, value in enumerate(values):
+                codes[self.keyword_masks[field][value]] = code
+            meta["keyword_values"][field] = values
+            np.save(tmp_path / f"keyword_{i}_codes.npy", codes)
+
+        offsets = [0]
+        with open(tmp_path / "docs.jsonl", "wb") as f_out:
+            for doc in self.docs:
+                line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+                f_out.write(line)
+                offsets.append(offsets[-1] + len(line))
+        np.save(tmp_path / "docs_offsets.npy", np.array(offsets, dtype=np.int64))
+
+        with open(tmp_path / "meta.json", "wt") as f_out:
+            json.dump(meta, f_out)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Opens a snapshot written by save().
+
+        Arrays and documents are memory-mapped read-only, so loading does not read the
+        postings into memory and several processes can share the same pages.
+
+        Args:
+            path (str): Snapshot directory.
+
+        Returns:
+            BM25Index: The loaded index.
+        """
+        path = Path(path)
+        with open(path / "meta.json", "rt") as f_in:
+            meta = json.load(f_in)
+        if meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {meta['version']} in {path}")
+
+        index = cls(meta["text_fields"], meta["keyword_fields"], k1=meta["k1"], b=meta["b"])
+        index.metadata = meta.get("metadata", {})
+        num_docs = meta["num_docs"]
+
+        for i, field in enumerate(index.text_fields):
+            terms = meta["vocabularies"][field]
+            index.vocabularies[field] = {term: term_id for term_id, term in enumerate(terms)}
+            index.matrices[field] = sparse.csr_matrix(
+                (
+                    np.load(path / f"text_{i}_data.npy", mmap_mode="r"),
+                    np.load(path / f"text_{i}_indices.npy", mmap_mode="r"),
+                    np.load(path / f"text_{i}_indptr.npy", mmap_mode="r"),
+                ),
+                shape=(len(terms), num_docs),
+                copy=False
+            )
+            index.doc_lengths[field] = np.load(path / f"text_{i}_lengths.npy", mmap_mode="r")
+
+        for i, field in enumerate(index.keyword_fields):
+            codes = np.load(path / f"keyword_{i}_codes.npy", mmap_mode="r")
+            values = meta["keyword_values"][field]
+            index.keyword_masks[field] = {value: codes == code for code, value in enumerate(values)}
+
+        index.docs = DocumentStore(path / "docs.jsonl", path / "docs_offsets.npy")
+        return index
+
+
+class DocumentStore:
+    def __init__(self, docs_path, offsets_path):
+        """
+        Read-only list of documents backed by a memory-mapped JSON lines file.
+
+        Documents are decoded on access.
+
+        Args:
+            docs_path (str): Path to the JSON lines file.
+            offsets_path (str): Path to the .npy file with the byte offset of every line.
+        """
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        if self.offsets[-1] > 0:
+            self.data = np.memmap(docs_path, dtype=np.uint8, mode="r")
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return json.loads(self.data[start:end].tobytes())
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def top_k(scores, k):
+    """
+    Returns positions of the k highest positive scores, best first.
+
+    Args:
+        scores (numpy.ndarray): Array of scores.
+        k (int): Number of positions to return.
+
+    Returns:
+        numpy.ndarray: Positions sorted by descending score.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -8,11 +8,15 @@ st.title("Course Assistant Dashboard")
 
 stats = get_stats()
 
-col1, col2, col3, col4 = st.columns(4)
+col1, col2, col3, col4, col5, col6 = st.columns(6)
 col1.metric("Total conversations", stats.total)
 col2.metric("Avg response time", f"{stats.avg_response_time:.2f}s")
-col3.metric("Total cost", f"${stats.total_cost:.4f}")
-col4.metric("Avg tokens", f"{stats.avg_tokens:.0f}")
+if stats.avg_time_to_first_token is not None:
+    col3.metric("Avg time to first token", f"{stats.avg_time_to_first_token:.2f}s")
+col4.metric("Total cost", f"${stats.total_cost:.4f}")
+col5.metric("Avg tokens", f"{stats.avg_tokens:.0f}")
+if stats.cache_hit_rate is not None:
+    col6.metric("Answer cache hit rate", f"{stats.cache_hit_rate:.1%}")
 
 
 records = get_conversations(limit=100)
@@ -22,7 +26,7 @@ st.subheader("Cost over time")
 st.line_chart(df, x="timestamp", y="cost")
 
 st.subheader("Response time over time")
-st.line_chart(df, x="timestamp", y="response_time")
+st.line_chart(df, x="timestamp", y=["response_time", "time_to_first_token"])
 
 
 st.subheader("Recent conversations")
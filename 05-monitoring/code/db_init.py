@@ -34,6 +34,9 @@ def init_db(drop=False):
                     completion_tokens INTEGER NOT NULL,
                     total_tokens INTEGER NOT NULL,
                     response_time FLOAT NOT NULL,
+                    time_to_first_token FLOAT,
+                    cache_hit TEXT,
+                    retries INTEGER NOT NULL DEFAULT 0,
                     cost FLOAT NOT NULL,
                     timestamp TIMESTAMP WITH TIME ZONE NOT NULL
                 )
@@ -43,6 +46,22 @@ def init_db(drop=False):
         conn.close()
 
 
+def migrate_db():
+    """Adds columns introduced after a conversations table was created."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                ALTER TABLE conversations
+                ADD COLUMN IF NOT EXISTS time_to_first_token FLOAT,
+                ADD COLUMN IF NOT EXISTS cache_hit TEXT,
+                ADD COLUMN IF NOT EXISTS retries INTEGER NOT NULL DEFAULT 0
+            """)
+        conn.commit()
+    finally:
+        conn.close()
+
+
 def init_feedback():
     conn = get_db_connection()
     try:
@@ -10,6 +10,8 @@ class Stats:
     avg_response_time: float
     total_cost: float
     avg_tokens: float
+    avg_time_to_first_token: float | None
+    cache_hit_rate: float | None
 
 
 def row_to_record(row):
@@ -22,8 +24,11 @@ def row_to_record(row):
         completion_tokens=row[8],
         total_tokens=row[9],
         response_time=row[10],
-        cost=row[11],
-        timestamp=row[12],
+        time_to_first_token=row[11],
+        cache_hit=row[12],
+        retries=row[13],
+        cost=row[14],
+        timestamp=row[15],
     )
 
 def get_conversations(limit=10):
@@ -35,7 +40,7 @@ def get_conversations(limit=10):
                 SELECT id, question, answer, course, model,
                        instructions, prompt,
                        prompt_tokens, completion_tokens, total_tokens,
-                       response_time, cost, timestamp
+                       response_time, time_to_first_token, cache_hit, retries, cost, timestamp
                 FROM conversations
                 ORDER BY timestamp DESC
                 LIMIT %s
@@ -59,7 +64,9 @@ def get_stats():
                     COUNT(*),
                     AVG(response_time),
                     SUM(cost),
-                    AVG(total_tokens)
+                    AVG(total_tokens),
+                    AVG(time_to_first_token),
+                    AVG(CASE WHEN cache_hit IS NULL THEN 0 ELSE 1 END)
                 FROM conversations
             """)
             row = cur.fetchone()
@@ -71,6 +78,8 @@ def get_stats():
         avg_response_time=row[1],
         total_cost=row[2],
         avg_tokens=row[3],
+        avg_time_to_first_token=row[4],
+        cache_hit_rate=row[5],
     )
 
 
@@ -13,9 +13,9 @@ def save_conversation(record, question, course):
                 INSERT INTO conversations (
                     question, answer, course, model, instructions, prompt,
                     prompt_tokens, completion_tokens, total_tokens,
-                    response_time, cost, timestamp
+                    response_time, time_to_first_token, cache_hit, retries, cost, timestamp
                 ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                 )
                 RETURNING id
                 """,
@@ -30,6 +30,9 @@ def save_conversation(record, question, course):
                     record.completion_tokens,
                     record.total_tokens,
                     record.response_time,
+                    record.time_to_first_token,
+                    record.cache_hit,
+                    record.retries,
                     record.cost,
                     timestamp,
                 ),
@@ -0,0 +1,58 @@
+import hashlib
+import uuid
+from dataclasses import dataclass, field
+
+
+HASH_FIELDS = ("course", "section", "question", "answer")
+
+
+def content_hash(doc: dict) -> str:
+    """Stable hash of the fields that define a FAQ entry.
+
+    Documents from the older documents.json keep the answer under "text".
+    """
+    values = {name: doc.get(name) for name in HASH_FIELDS}
+    if values["answer"] is None:
+        values["answer"] = doc.get("text")
+    payload = "\x1f".join(str(values[name] or "").strip() for name in HASH_FIELDS)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def point_id(doc: dict) -> str:
+    """Deterministic point id derived from the content hash."""
+    return str(uuid.UUID(hex=content_hash(doc)[:32]))
+
+
+@dataclass
+class SyncPlan:
+    to_upsert: list[dict] = field(default_factory=list)
+    to_delete: list[str | int] = field(default_factory=list)
+    unchanged: int = 0
+
+    def __str__(self):
+        return (f"{len(self.to_upsert)} to upsert, {len(self.to_delete)} to delete, "
+                f"{self.unchanged} unchanged")
+
+
+def plan_sync(existing_ids, documents: list[dict]) -> SyncPlan:
+    """Compares the ids already in an index with the current documents.
+
+    Changed documents get a new id, so they show up as one upsert plus
+    one delete of the old version. Ids are compared as strings, but
+    to_delete keeps the original ids (e.g. the integer ids of points
+    written before content-hash ids), so they can be passed to a delete.
+    """
+    existing_ids = {str(i): i for i in existing_ids}
+
+    current = {}
+    for doc in documents:
+        current.setdefault(point_id(doc), doc)
+
+    plan = SyncPlan()
+    for doc_id, doc in current.items():
+        if doc_id in existing_ids:
+            plan.unchanged += 1
+        else:
+            plan.to_upsert.append(doc)
+    plan.to_delete = [existing_ids[i] for i in sorted(existing_ids.keys() - current.keys())]
+    return plan
@@ -1,30 +1,52 @@
-import requests
-from minsearch import Index
+import os
 
+from answer_cache import corpus_fingerprint
+from bm25_index import BM25Index
+from faq_fetcher import FAQFetcher
+from incremental_sync import plan_sync, point_id
 
-def load_faq_data():
-    docs_url = 'https://datatalks.club/faq/json/courses.json'
-    response = requests.get(docs_url)
-    courses_raw = response.json()
 
-    documents = []
-    url_prefix = 'https://datatalks.club/faq'
-
-    for course in courses_raw:
-        course_url = f'{url_prefix}{course["path"]}'
-        course_response = requests.get(course_url)
-        course_response.raise_for_status()
-        course_data = course_response.json()
-
-        documents.extend(course_data)
-
-    return documents
+def load_faq_data(offline=None):
+    fetcher = FAQFetcher(offline=offline)
+    return fetcher.load_faq_data()
 
 
 def build_index(documents):
-    index = Index(
+    index = BM25Index(
         text_fields=['question', 'section', 'answer'],
         keyword_fields=['course']
     )
     index.fit(documents)
     return index
+
+
+def save_index(index, path):
+    # stored in the snapshot, so starting the app does not decode every document
+    index.metadata["fingerprint"] = corpus_fingerprint(index.docs)
+    index.save(path)
+
+
+def load_index(path):
+    return BM25Index.load(path)
+
+
+def index_fingerprint(index):
+    fingerprint = index.metadata.get("fingerprint")
+    if fingerprint is None:
+        # snapshot saved before fingerprints were stored
+        fingerprint = corpus_fingerprint(index.docs)
+    return fingerprint
+
+
+def sync_index(documents, path):
+    if os.path.exists(path):
+        index = load_index(path)
+        existing_ids = [point_id(doc) for doc in index.docs]
+        plan = plan_sync(existing_ids, documents)
+        print(f"Sync {path}: {plan}")
+        if not plan.to_upsert and not plan.to_delete:
+            return index
+
+    index = build_index(documents)
+    save_index(index, path)
+    return index
@@ -2,6 +2,7 @@ import time
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from answer_cache import prompt_version
 from rag_helper import RAGBase
 
 
@@ -16,6 +17,9 @@ class LLMCallRecord:
     total_tokens: int
     response_time: float
     cost: float
+    time_to_first_token: float | None = None
+    cache_hit: str | None = None
+    retries: int = 0
     timestamp: datetime = field(default_factory=datetime.now)
 
 
@@ -26,44 +30,160 @@ def calculate_cost(model, usage):
     return cost
 
 
+# events that carry the final response of a stream
+STREAM_END_EVENTS = {"response.completed", "response.incomplete", "response.failed"}
+
+
 class RAGWithMetrics(RAGBase):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, answer_cache=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.answer_cache = answer_cache
         self.last_call: LLMCallRecord = None
+        # status of the last LLM response, answers are cached only when it is "completed"
+        self.last_status: str | None = None
+
+    @property
+    def prompt_version(self):
+        return prompt_version(self.instructions, self.prompt_template)
+
+    def rag(self, query):
+        answer = self._cached_answer(query)
+        if answer is not None:
+            return answer
+
+        self.last_status = None
+        answer = super().rag(query)
+        if self.last_status == "completed":
+            self._store_answer(query, answer)
+        return answer
+
+    def rag_stream(self, query):
+        answer = self._cached_answer(query)
+        if answer is not None:
+            yield answer
+            return
+
+        self.last_status = None
+        deltas = []
+        for delta in super().rag_stream(query):
+            deltas.append(delta)
+            yield delta
+        # only reached when the stream was consumed to the end without an error
+        if self.last_status == "completed":
+            self._store_answer(query, "".join(deltas))
+
+    def _cached_answer(self, query):
+        """Looks the question up in the answer cache and logs a free call on a hit."""
+        if self.answer_cache is None:
+            return None
+
+        start_time = time.time()
+        answer, tier = self.answer_cache.lookup(query, self.course, self.model, self.prompt_version)
+        if answer is None:
+            return None
+        response_time = time.time() - start_time
+
+        call_record = LLMCallRecord(
+            model=self.model,
+            prompt="",
+            instructions=self.instructions,
+            answer=answer,
+            prompt_tokens=0,
+            completion_tokens=0,
+            total_tokens=0,
+            response_time=response_time,
+            cost=0.0,
+            time_to_first_token=response_time,
+            cache_hit=tier,
+        )
+
+        print(call_record)
+        print(f"Answer cache hit rate: {self.answer_cache.stats.hit_rate:.1%}")
+        self.last_call = call_record
+        return answer
+
+    def _store_answer(self, query, answer):
+        if self.answer_cache is not None and answer:
+            self.answer_cache.store(query, self.course, self.model, self.prompt_version, answer)
 
     def llm(self, prompt):
+        self.last_call = None
+        self.last_status = None
         start_time = time.time()
         response = self._call_llm(prompt)
         response_time = time.time() - start_time
+        self.last_status = response.status
         self._log_response(prompt, response, response_time)
         return response.output_text
 
+    def llm_stream(self, prompt):
+        """Yields answer text deltas and logs the call once the stream ends.
+
+        response_time is the total generation time, time_to_first_token the
+        delay until the first text delta arrived (None if none did). A call
+        is logged even if the stream fails, ends incomplete or is abandoned,
+        with the text received so far and the usage if the API reported it.
+        """
+        self.last_call = None
+        self.last_status = None
+        start_time = time.time()
+        time_to_first_token = None
+        response = None
+        deltas = []
+
+        stream = self.retry_policy.call(
+            self.llm_client.responses.create,
+            model=self.model,
+            input=self.build_messages(prompt),
+            stream=True
+        )
+        try:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    if time_to_first_token is None:
+                        time_to_first_token = time.time() - start_time
+                    deltas.append(event.delta)
+                    yield event.delta
+                elif event.type in STREAM_END_EVENTS:
+                    response = event.response
+        finally:
+            response_time = time.time() - start_time
+            self.last_status = response.status if response is not None else None
+            if response is None or response.status != "completed":
+                print(f"LLM stream ended without completing "
+                      f"({response.status if response is not None else 'no response'})")
+            self._log_response(prompt, response, response_time, time_to_first_token, answer="".join(deltas))
+
     def _call_llm(self, prompt):
         input_messages = [
             {"role": "developer", "content": self.instructions},
             {"role": "user", "content": prompt}
         ]
-        response = self.llm_client.responses.create(
+        response = self.retry_policy.call(
+            self.llm_client.responses.create,
             model=self.model,
             input=input_messages
         )
         return response
 
-    def _log_response(self, prompt, response, response_time):
-        usage = response.usage
-        cost = calculate_cost(self.model, usage)
+    def _log_response(self, prompt, response, response_time, time_to_first_token=None, answer=None):
+        usage = getattr(response, "usage", None)
+        if answer is None:
+            answer = response.output_text
 
         call_record = LLMCallRecord(
             model=self.model,
             prompt=prompt,
             instructions=self.instructions,
-            answer=response.output_text,
-            prompt_tokens=usage.input_tokens,
-            completion_tokens=usage.output_tokens,
-            total_tokens=usage.total_tokens,
+            answer=answer,
+            prompt_tokens=usage.input_tokens if usage else 0,
+            completion_tokens=usage.output_tokens if usage else 0,
+            total_tokens=usage.total_tokens if usage else 0,
             response_time=response_time,
-            cost=cost,
+            cost=calculate_cost(self.model, usage) if usage else 0.0,
+            time_to_first_token=time_to_first_token,
+            retries=self.retry_policy.last_retries,
         )
     
         print(call_record)
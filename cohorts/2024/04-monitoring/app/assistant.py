@@ -7,17 +7,27 @@ from openai import OpenAI
 from elasticsearch import Elasticsearch
 from sentence_transformers import SentenceTransformer
 
+from embedding_cache import EmbeddingCache, cache_key, cached_encode
+from query_cache import QueryEmbeddingCache
+
 
 ELASTIC_URL = os.getenv("ELASTIC_URL", "http://elasticsearch:9200")
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://ollama:11434/v1/")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here")
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "embedding_cache.db")
 
 
 es_client = Elasticsearch(ELASTIC_URL)
 ollama_client = OpenAI(base_url=OLLAMA_URL, api_key="ollama")
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-model = SentenceTransformer("multi-qa-MiniLM-L6-cos-v1")
+MODEL_NAME = "multi-qa-MiniLM-L6-cos-v1"
+model = SentenceTransformer(MODEL_NAME)
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE, max_entries=100_000)
+query_cache = QueryEmbeddingCache(
+    maxsize=int(os.getenv("QUERY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "86400")),
+)
 
 
 def elastic_search_text(query, course, index_name="course-questions"):
@@ -155,9 +165,15 @@ def calculate_openai_cost(model_choice, tokens):
     return openai_cost
 
 
+def embed_query(query):
+    # query_cache is lost on restart, the SQLite cache keeps the vectors
+    key = cache_key(MODEL_NAME, model.max_seq_length)
+    return cached_encode(embedding_cache, key, [query], model.encode)[0]
+
+
 def get_answer(query, course, model_choice, search_type):
     if search_type == 'Vector':
-        vector = model.encode(query)
+        vector = query_cache.get(MODEL_NAME, query, embed_query)
         search_results = elastic_search_knn('question_text_vector', vector, course)
     else:
         search_results = elastic_search_text(query, course)
@@ -0,0 +1,157 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def cache_key(model, max_length=None, normalize=False):
+    """The model part of the key. Texts longer than max_length are truncated,
+    so vectors computed with different limits are kept apart."""
+    key = model if max_length is None else f"{model}:max_length={max_length}"
+    return f"{key}:normalized" if normalize else key
+
+
+def cached_encode(cache, key, texts, encode_missing):
+    """Vectors for texts, calling encode_missing(texts) only for the ones the cache lacks."""
+    cached = cache.get_many(key, texts)
+    missing = [i for i, vector in enumerate(cached) if vector is None]
+
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        vectors = encode_missing(missing_texts)
+        cache.put_many(key, missing_texts, vectors)
+        for i, vector in zip(missing, vectors):
+            cached[i] = vector
+
+    if not cached:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(cached).astype(np.float32)
+
+
+class EmbeddingCache:
+    """Persistent float32 vectors keyed by (model, normalized text hash).
+
+    Stored in SQLite so every script and notebook can share one file.
+    With max_entries set, the least recently used vectors are evicted.
+    """
+
+    def __init__(self, path="embedding_cache.db", max_entries=None, chunk_size=500):
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model, texts):
+        """Returns one vector per text, or None where the cache has no entry."""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            for i in range(0, len(hashes), self.chunk_size):
+                chunk = list(set(hashes[i:i + self.chunk_size]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+                self._conn.execute(
+                    f"UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                    [now, model, *chunk],
+                )
+            self._conn.commit()
+
+        result = [found.get(h) for h in hashes]
+        hits = sum(v is not None for v in result)
+        self.hits += hits
+        self.misses += len(result) - hits
+        return result
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = [
+            (model, text_hash(text), len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE rowid IN (
+                        SELECT rowid FROM embeddings ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class CachedEmbedder:
+    """Embedder wrapper that only runs the model for texts missing from the cache."""
+
+    def __init__(self, embedder, cache, model=None):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = model or embedder.model_id
+
+    def _key(self, normalize):
+        return cache_key(self.model, getattr(self.embedder, "max_length", None), normalize)
+
+    def encode(self, text, normalize=True):
+        return self.encode_batch([text], normalize=normalize)[0]
+
+    def encode_batch(self, texts, normalize=True):
+        return cached_encode(self.cache, self._key(normalize), texts,
+                             lambda missing: self.embedder.encode_batch(missing, normalize=normalize))
+
+    def encode_corpus(self, texts, normalize=True, **kwargs):
+        from embedder import PaddingStats
+
+        stats = PaddingStats()
+
+        def encode_missing(missing):
+            nonlocal stats
+            vectors, stats = self.embedder.encode_corpus(missing, normalize=normalize, **kwargs)
+            return vectors
+
+        return cached_encode(self.cache, self._key(normalize), texts, encode_missing), stats
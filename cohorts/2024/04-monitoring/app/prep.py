@@ -3,16 +3,19 @@ import requests
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import streaming_bulk
 from tqdm.auto import tqdm
 from dotenv import load_dotenv
 
 from db import init_db
+from embedding_cache import EmbeddingCache, cache_key, cached_encode
 
 load_dotenv()
 
 ELASTIC_URL = os.getenv("ELASTIC_URL_LOCAL")
 MODEL_NAME = os.getenv("MODEL_NAME")
 INDEX_NAME = os.getenv("INDEX_NAME")
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "embedding_cache.db")
 
 BASE_URL = "https://github.com/DataTalksClub/llm-zoomcamp/blob/main"
 
@@ -74,13 +77,25 @@ def setup_elasticsearch():
     return es_client
 
 
-def index_documents(es_client, documents, model):
+def index_documents(es_client, documents, model, batch_size=64, cache=None):
     print("Indexing documents...")
-    for doc in tqdm(documents):
-        question = doc["question"]
-        text = doc["text"]
-        doc["question_text_vector"] = model.encode(question + " " + text).tolist()
-        es_client.index(index=INDEX_NAME, document=doc)
+    texts = [doc["question"] + " " + doc["text"] for doc in documents]
+
+    def encode(texts):
+        return model.encode(texts, batch_size=batch_size, show_progress_bar=True)
+
+    if cache is None:
+        vectors = encode(texts)
+    else:
+        key = cache_key(MODEL_NAME, model.max_seq_length)
+        vectors = cached_encode(cache, key, texts, encode)
+    for doc, vector in zip(documents, vectors):
+        doc["question_text_vector"] = vector.tolist()
+
+    actions = ({"_index": INDEX_NAME, "_source": doc} for doc in documents)
+    for ok, result in tqdm(streaming_bulk(es_client, actions, chunk_size=500), total=len(documents)):
+        if not ok:
+            print(f"Failed to index document: {result}")
     print(f"Indexed {len(documents)} documents")
 
 
@@ -93,7 +108,7 @@ def main():
     ground_truth = fetch_ground_truth()
     model = load_model()
     es_client = setup_elasticsearch()
-    index_documents(es_client, documents, model)
+    index_documents(es_client, documents, model, cache=EmbeddingCache(EMBEDDING_CACHE))
     # you may consider to comment <end>
 
     print("Initializing database...")